@@ -0,0 +1,4 @@
+from .settings import RenderSettings
+from .engine import FrameRenderer, RenderCancelled, render_video
+
+__all__ = ["RenderSettings", "FrameRenderer", "RenderCancelled", "render_video"]
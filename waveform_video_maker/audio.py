@@ -0,0 +1,125 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+WINDOW_SECONDS = 0.05  # 50 ms of audio drawn per frame
+
+# Digests already computed by this process, keyed by (path, size, mtime)
+_digests = {}
+
+
+def file_digest(path):
+    # Content hash of a file, so renamed or copied episodes share cache entries
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _digests[key] = digest.hexdigest()
+    return _digests[key]
+
+
+@contextlib.contextmanager
+def replace_atomically(path, mode="wb", **kwargs):
+    # Opens a new file that takes the place of `path` once it is closed, so a
+    # concurrent render never reads half a file. Every writer, including
+    # threads of one process, gets a temporary file of its own.
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _cache_paths(path, cache_dir):
+    digest = file_digest(path)
+    return os.path.join(cache_dir, f"{digest}.npy"), os.path.join(cache_dir, f"{digest}.json")
+
+
+def is_cached(path, cache_dir):
+    # Whether the decoded samples of the whole file are in the cache
+    return bool(cache_dir) and all(os.path.exists(p) for p in _cache_paths(path, cache_dir))
+
+
+def _cached_pcm(path, cache_dir):
+    # Decoded mono PCM of the whole file, memory-mapped from the cache.
+    # Decodes and stores it on a miss.
+    pcm_path, meta_path = _cache_paths(path, cache_dir)
+    if os.path.exists(pcm_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            sr = json.load(f)["sr"]
+        return np.load(pcm_path, mmap_mode="r"), sr
+
+    import librosa
+    y, sr = librosa.load(path, sr=None)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # The samples go first: an entry counts once its metadata exists
+    with replace_atomically(pcm_path) as f:
+        np.save(f, y)
+    with replace_atomically(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"sr": sr, "source": os.path.basename(path)}, f)
+    return np.load(pcm_path, mmap_mode="r"), sr
+
+
+def load_audio_range(path, offset=0.0, duration=None, cache_dir=None):
+    # Mono samples of [offset, offset + duration) at the file's own rate.
+    # With a cache_dir, a cached decode is sliced without decoding anything;
+    # full-length loads populate the cache, partial ones (previews) only
+    # decode their own range.
+    if cache_dir:
+        full = not offset and duration is None
+        if full or is_cached(path, cache_dir):
+            y, sr = _cached_pcm(path, cache_dir)
+            start = int(round(offset * sr))
+            stop = None if duration is None else start + int(round(duration * sr))
+            return y[start:stop], sr
+
+    import librosa
+    return librosa.load(path, sr=None, offset=offset, duration=duration)
+
+
+def audio_duration(path, cache_dir=None):
+    # Length of the file in seconds, read from the cache or the file's header
+    # without decoding it
+    if is_cached(path, cache_dir):
+        y, sr = _cached_pcm(path, cache_dir)
+        return len(y) / sr
+
+    import librosa
+    return librosa.get_duration(path=path)
+
+
+class FrameWindows:
+    # Sample window of every video frame, computed once from sr and fps so a
+    # frame's samples are found in O(1) instead of searching a time array
+    def __init__(self, y, sr, fps, duration=None, window_seconds=WINDOW_SECONDS):
+        self.y = y
+        self.sr = sr
+        self.fps = fps
+        self.window_size = int(sr * window_seconds)
+
+        duration = len(y) / sr if duration is None else duration
+        frame_count = max(1, int(np.ceil(duration * fps)))
+        centers = np.minimum(np.round(np.arange(frame_count) * sr / fps).astype(np.int64), max(0, len(y) - 1))
+        self.starts = np.maximum(0, centers - self.window_size // 2)
+        self.ends = np.minimum(len(y), centers + self.window_size // 2)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, frame_index):
+        # Zero-copy view of the frame's samples (shorter at the edges of the track)
+        return self.y[self.starts[frame_index]:self.ends[frame_index]]
+
+    def frame_at(self, t):
+        return min(max(0, int(round(t * self.fps))), len(self) - 1)
@@ -0,0 +1,94 @@
+# Batch renderer: runs the jobs of a JSON manifest across a process pool.
+#
+# Manifest format:
+#   {
+#     "defaults": {"circle_waveform": true, "wf_color": "#00FFAA"},
+#     "jobs": [
+#       {"audio_file": "ep01.mp3", "output_file": "ep01.mp4"},
+#       {"audio_file": "ep02.mp3", "output_file": "ep02.mp4", "bloom_intensity": 1.5}
+#     ]
+#   }
+# A bare list of jobs is accepted too. Job keys are RenderSettings fields.
+import argparse
+import dataclasses
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+from .settings import RenderSettings
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if isinstance(manifest, list):
+        defaults, jobs = {}, manifest
+    else:
+        defaults, jobs = manifest.get("defaults", {}), manifest.get("jobs", [])
+
+    # Validate every job up front so a typo fails the run before any rendering starts
+    jobs = [RenderSettings.from_dict({**defaults, **job}) for job in jobs]
+    for job in jobs:
+        job.expand_renditions()
+    return jobs
+
+
+def output_files(settings):
+    return [output.output_file for output in settings.expand_renditions()]
+
+
+def run_job(settings):
+    from .engine import render_video
+
+    started = time.perf_counter()
+    name = ", ".join(output_files(settings))
+    try:
+        render_video(settings, logger=None)
+        return name, None, time.perf_counter() - started
+    except Exception:
+        return name, traceback.format_exc(), time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a manifest of waveform videos in parallel.")
+    parser.add_argument("manifest", help="JSON manifest of render jobs")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: one per core)")
+    parser.add_argument("--skip-existing", action="store_true", help="Skip jobs whose output file already exists")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a <output>.perf.json timing report next to every video")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    if args.profile:
+        jobs = [dataclasses.replace(job, profile=True) for job in jobs]
+    if args.skip_existing:
+        jobs = [job for job in jobs if not all(os.path.exists(output) for output in output_files(job))]
+    if not jobs:
+        print("Nothing to render.")
+        return 0
+
+    processes = max(1, min(args.jobs, len(jobs)))
+    print(f"Rendering {len(jobs)} job(s) with {processes} worker(s)")
+
+    failed = 0
+    # One job per worker process; recycle workers so memory is returned between jobs
+    with multiprocessing.Pool(processes=processes, maxtasksperchild=1) as pool:
+        for done, (output_file, error, elapsed) in enumerate(pool.imap_unordered(run_job, jobs), start=1):
+            if error:
+                failed += 1
+                print(f"[{done}/{len(jobs)}] FAILED {output_file} after {elapsed:.1f}s\n{error}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(jobs)}] {output_file} ({elapsed:.1f}s)")
+
+    if failed:
+        print(f"{failed} of {len(jobs)} job(s) failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# Frame rendering benchmark over every render mode, on synthetic audio and
+# generated backgrounds so runs are reproducible on any machine.
+#
+#   python -m waveform_video_maker.benchmark --save-baseline baseline.json
+#   python -m waveform_video_maker.benchmark --baseline baseline.json
+#
+# Every case runs in a fresh process and times FrameRenderer.make_frame over
+# consecutive frames (encoding is not included). Against a baseline, the run
+# fails when a case's throughput drops or its peak memory grows by more than
+# the threshold.
+#
+#   python -m waveform_video_maker.benchmark --parity
+#
+# checks instead that the NumPy renderer still looks like the matplotlib one:
+# every case renders the same frames with both, and the run fails when the
+# mean or 99th percentile pixel difference passes its limit. It also checks
+# that a peak pyramid sliced out of a whole track draws the same columns as
+# one built from the range alone.
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import psutil
+from PIL import Image
+
+SAMPLE_RATE = 44100
+AUDIO_SECONDS = 10
+FPS = 24
+
+MODES = {
+    "linear": dict(circle_waveform=False),
+    "circle": dict(circle_waveform=True),
+    "circle2": dict(circle_waveform=True, draw_second_circle=True, second_waveform_scale=1.4),
+}
+BLOOMS = {
+    "bloom_low": dict(blur_radius=5),
+    "bloom_high": dict(blur_radius=60),
+}
+BACKGROUNDS = ("solid", "image", "video")
+ASPECTS = {
+    "16x9": dict(aspect_ratio_9_16=False),
+    "9x16": dict(aspect_ratio_9_16=True),
+}
+AUDIO = ("tone", "noise", "silence")
+
+# Largest mean and 99th percentile absolute difference (0-255, over all
+# channels) allowed between the NumPy and matplotlib renderers' frames
+PARITY_MEAN = 3.0
+PARITY_P99 = 32
+
+
+def synthetic_audio(kind, seconds=AUDIO_SECONDS, sr=SAMPLE_RATE):
+    t = np.arange(int(seconds * sr)) / sr
+    if kind == "tone":
+        # A chord whose loudness swells, so the waveform shape changes every frame
+        y = sum(np.sin(2 * np.pi * f * t) for f in (110, 220, 330)) / 3
+        return (y * (0.5 + 0.5 * np.sin(2 * np.pi * 0.5 * t))).astype(np.float32)
+    if kind == "noise":
+        return np.random.default_rng(0).uniform(-1, 1, len(t)).astype(np.float32)
+    if kind == "silence":
+        return np.zeros(len(t), dtype=np.float32)
+    raise ValueError(f"Unknown audio: {kind}")
+
+
+def make_assets(work_dir):
+    # Background image and video used by the "image" and "video" cases
+    from .video_source import ffmpeg_binary
+
+    image_path = os.path.join(work_dir, "background.png")
+    if not os.path.exists(image_path):
+        x = np.linspace(0, 255, 1280, dtype=np.float32)
+        y = np.linspace(0, 255, 720, dtype=np.float32)[:, None]
+        gradient = np.stack([np.broadcast_to(x, (720, 1280)), np.broadcast_to(y, (720, 1280)),
+                             np.full((720, 1280), 96, np.float32)], axis=-1)
+        Image.fromarray(gradient.astype(np.uint8)).save(image_path)
+
+    video_path = os.path.join(work_dir, "background.mp4")
+    if not os.path.exists(video_path):
+        subprocess.run([ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=1280x720:rate=30",
+                        "-t", "3", "-pix_fmt", "yuv420p", video_path], check=True)
+    return image_path, video_path
+
+
+def cases():
+    for (mode, bloom, background, aspect, audio) in itertools.product(MODES, BLOOMS, BACKGROUNDS, ASPECTS, AUDIO):
+        yield "-".join((mode, bloom, background, aspect, audio))
+
+
+def case_settings(name, renderer, assets):
+    from .settings import RenderSettings
+
+    mode, bloom, background, aspect, audio = name.split("-")
+    image_path, video_path = assets
+    return RenderSettings(
+        renderer=renderer,
+        fps=FPS,
+        background_image=image_path if background == "image" else None,
+        background_video=video_path if background == "video" else None,
+        **MODES[mode], **BLOOMS[bloom], **ASPECTS[aspect],
+    ), audio
+
+
+def run_case(args):
+    # Runs in its own process, so peak memory belongs to this case alone
+    from .engine import FrameRenderer
+    from .profiling import peak_rss
+    from .video_source import BackgroundVideoSource
+
+    name, renderer_name, assets, frames, warmup = args
+    settings, audio = case_settings(name, renderer_name, assets)
+    y = synthetic_audio(audio)
+    duration = len(y) / SAMPLE_RATE
+
+    background_clip = None
+    if settings.background_video:
+        background_clip = BackgroundVideoSource(settings.background_video, settings.video_size, settings.fps)
+        background_clip.wait()
+    renderer = FrameRenderer(settings, y, SAMPLE_RATE, duration, background_clip)
+
+    times = []
+    try:
+        for frame_index in range(warmup + frames):
+            started = time.perf_counter()
+            renderer.make_frame(frame_index / settings.fps)
+            if frame_index >= warmup:
+                times.append(time.perf_counter() - started)
+    finally:
+        renderer.close()
+
+    times = np.array(times)
+    return name, {
+        "fps": len(times) / times.sum(),
+        "p50_ms": 1000 * float(np.percentile(times, 50)),
+        "p90_ms": 1000 * float(np.percentile(times, 90)),
+        # High-water mark of the case's own process, spikes within a frame included
+        "peak_rss_mb": peak_rss(psutil.Process(os.getpid())) / (1024 * 1024),
+    }
+
+
+def parity_case(args):
+    # Worst difference between the two renderers over a few frames of one case
+    from .engine import FrameRenderer
+    from .video_source import BackgroundVideoSource
+
+    name, assets, frames = args
+    frames_by_renderer = {}
+    for renderer_name in ("matplotlib", "numpy"):
+        settings, audio = case_settings(name, renderer_name, assets)
+        y = synthetic_audio(audio)
+        background_clip = None
+        if settings.background_video:
+            background_clip = BackgroundVideoSource(settings.background_video, settings.video_size, settings.fps)
+        renderer = FrameRenderer(settings, y, SAMPLE_RATE, len(y) / SAMPLE_RATE, background_clip)
+        try:
+            # Spread over the clip, so swells and quiet passages are both covered
+            times = np.linspace(0, AUDIO_SECONDS - 1, frames)
+            frames_by_renderer[renderer_name] = [renderer.make_frame(t).astype(np.int16) for t in times]
+        finally:
+            renderer.close()
+
+    mean = p99 = 0.0
+    for reference, frame in zip(frames_by_renderer["matplotlib"], frames_by_renderer["numpy"]):
+        difference = np.abs(reference - frame)
+        mean = max(mean, float(difference.mean()))
+        p99 = max(p99, float(np.percentile(difference, 99)))
+    return name, {"mean_diff": mean, "p99_diff": p99}
+
+
+def peaks_parity():
+    # Names of the slices whose columns differ from those of a pyramid built
+    # from the range itself. One range is silent between loud sections, so
+    # anything read from outside the range shows; the other starts on a
+    # coarse block boundary, so every level's blocks line up exactly.
+    from .peaks import BLOCK_SIZE, PeakPyramid
+
+    loud = np.random.default_rng(0).uniform(-1, 1, 30 * SAMPLE_RATE).astype(np.float32)
+    failures = []
+    for name, offset, length, silent in (("silent", 7 * SAMPLE_RATE + 123, 5 * SAMPLE_RATE + 45, True),
+                                         ("aligned", BLOCK_SIZE << 12, 3 * SAMPLE_RATE + 7, False)):
+        track = loud.copy()
+        if silent:
+            track[offset:offset + length] = 0
+        y = track[offset:offset + length]
+        sliced = PeakPyramid.build(track).slice(offset, length)
+        built = PeakPyramid.build(y)
+        for seconds, count, center in itertools.product((0.5, 2, 10, 60), (100, 1920), (0, length / 2, length)):
+            start = center - seconds * SAMPLE_RATE / 2
+            stop = start + seconds * SAMPLE_RATE
+            if not np.array_equal(sliced.columns(y, start, stop, count), built.columns(y, start, stop, count)):
+                failures.append(f"{name} range, {seconds}s window, {count} columns at sample {center:.0f}")
+    return failures
+
+
+def compare(results, baseline, threshold):
+    # Cases slower or hungrier than the baseline by more than `threshold`
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["fps"] < base["fps"] * (1 - threshold):
+            regressions.append(f"{name}: {result['fps']:.2f} fps, baseline {base['fps']:.2f} fps")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{name}: peak {result['peak_rss_mb']:.0f} MB, "
+                               f"baseline {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark frame rendering across every render mode.")
+    parser.add_argument("-k", dest="filter", default="",
+                        help="Only run cases having every comma-separated part in their name, e.g. circle,9x16")
+    parser.add_argument("--renderer", default="matplotlib", choices=("matplotlib", "numpy"))
+    parser.add_argument("--frames", type=int, default=24, help="Timed frames per case (default: 24)")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed frames rendered first (default: 2)")
+    parser.add_argument("--work-dir", help="Where generated backgrounds are kept (default: a temporary directory)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--save-baseline", help="Save the results as a baseline JSON file")
+    parser.add_argument("--baseline", help="Compare against a baseline JSON file; regressions fail the run")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed fps drop / memory growth against the baseline (default: 0.15)")
+    parser.add_argument("--parity", action="store_true",
+                        help="Compare the NumPy renderer's frames against matplotlib's instead of timing")
+    args = parser.parse_args(argv)
+
+    parts = [part for part in args.filter.split(",") if part]
+    selected = [name for name in cases() if all(part in name.split("-") for part in parts)]
+    if not selected:
+        print("No benchmark cases match.")
+        return 1
+
+    if args.parity:
+        return run_parity(selected, args)
+
+    with tempfile.TemporaryDirectory(prefix="wvm-benchmark-") as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        assets = make_assets(work_dir)
+
+        results = {}
+        jobs = [(name, args.renderer, assets, args.frames, args.warmup) for name in selected]
+        # One case at a time, each in a new process, so cases don't compete for cores or share memory
+        with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+            for done, (name, result) in enumerate(pool.imap(run_case, jobs), start=1):
+                results[name] = result
+                print(f"[{done}/{len(jobs)}] {name}: {result['fps']:.2f} fps, "
+                      f"p90 {result['p90_ms']:.1f} ms, peak {result['peak_rss_mb']:.0f} MB")
+
+    report = {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    "cpus": os.cpu_count(), "python": platform.python_version()},
+        "renderer": args.renderer,
+        "frames": args.frames,
+        "cases": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("renderer") != args.renderer:
+            print(f"Baseline was recorded with the {baseline.get('renderer')} renderer", file=sys.stderr)
+            return 1
+        regressions = compare(results, baseline["cases"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) past {args.threshold:.0%}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+        print(f"No regressions past {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+def run_parity(selected, args):
+    peak_failures = peaks_parity()
+    for failure in peak_failures:
+        print(f"Sliced peak pyramid differs: {failure}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix="wvm-benchmark-") as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        assets = make_assets(work_dir)
+
+        failures = []
+        jobs = [(name, assets, max(1, min(args.frames, 8))) for name in selected]
+        with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+            for done, (name, result) in enumerate(pool.imap(parity_case, jobs), start=1):
+                failed = result["mean_diff"] > PARITY_MEAN or result["p99_diff"] > PARITY_P99
+                if failed:
+                    failures.append(name)
+                print(f"[{done}/{len(jobs)}] {name}: mean {result['mean_diff']:.2f}, "
+                      f"p99 {result['p99_diff']:.0f}{' FAILED' if failed else ''}")
+
+    if failures:
+        print(f"{len(failures)} case(s) past mean {PARITY_MEAN} / p99 {PARITY_P99}: {', '.join(failures)}",
+              file=sys.stderr)
+    if failures or peak_failures:
+        return 1
+    print(f"The NumPy renderer matches matplotlib within mean {PARITY_MEAN} / p99 {PARITY_P99}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# Composites the waveform layer over the background with integer math into a
+# preallocated frame. Static backgrounds are decoded and resized once.
+import numpy as np
+from PIL import Image
+
+
+class Background:
+    # A background frame as RGB (copied straight into the output) and, for
+    # static backgrounds, RGBA in the same layout as the waveform layer
+    def __init__(self, rgb, keep_rgba=True):
+        self.rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+        self.rgba = None
+        if keep_rgba:
+            self.rgba = np.empty(self.rgb.shape[:2] + (4,), dtype=np.uint8)
+            self.rgba[:, :, :3] = self.rgb
+            self.rgba[:, :, 3] = 255
+
+
+def load_background_image(path, size):
+    # Decode and scale a background image once
+    with Image.open(path) as image:
+        return Background(np.array(image.resize(size).convert('RGB')))
+
+
+def solid_background(color, size):
+    return Background(np.array(Image.new('RGB', size, color)))
+
+
+class Compositor:
+    def __init__(self, width, height):
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)
+
+        # Four-channel uint16 scratch space, so every step is a contiguous
+        # same-type operation: 255 * 255 still fits, no float temporaries
+        shape = (height, width, 4)
+        self._fg = np.empty(shape, dtype=np.uint16)
+        self._bg = np.empty(shape, dtype=np.uint16)
+        self._alpha = np.empty(shape, dtype=np.uint16)
+        self._alpha_bytes = np.empty((height, width), dtype=np.uint32)
+        self._blended = np.empty(shape, dtype=np.uint8)
+
+    def composite(self, layer, background, box=None):
+        # Straight-alpha RGBA layer over a Background. `box` (x0, y0, x1, y1)
+        # bounds the pixels that are not fully transparent. Returns a buffer
+        # that is reused by the next call.
+        frame = self.frame
+        if box is None:
+            box = (0, 0, frame.shape[1], frame.shape[0])
+        else:
+            np.copyto(frame, background.rgb)
+        x0, y0, x1, y1 = box
+        region = np.s_[y0:y1, x0:x1]
+
+        fg, bg, alpha = self._fg[region], self._bg[region], self._alpha[region]
+
+        # Spread each pixel's alpha over all four bytes
+        alpha_bytes = self._alpha_bytes[region]
+        np.right_shift(layer[region].view(np.uint32)[:, :, 0], 24, out=alpha_bytes)
+        alpha_bytes *= 0x01010101
+        np.copyto(alpha, alpha_bytes[:, :, None].view(np.uint8))
+
+        # Premultiplied foreground plus background weighted by 255 - alpha
+        np.copyto(fg, layer[region])
+        fg *= alpha
+        np.subtract(255, alpha, out=alpha)
+        if background.rgba is not None:
+            np.copyto(bg, background.rgba[region])
+        else:
+            np.copyto(bg[:, :, :3], background.rgb[region])
+        bg *= alpha
+        fg += bg
+
+        # Rounded division by 255: (x + 128 + ((x + 128) >> 8)) >> 8
+        fg += 128
+        np.right_shift(fg, 8, out=bg)
+        fg += bg
+        fg >>= 8
+
+        blended = self._blended[region]
+        np.copyto(blended, fg, casting='unsafe')
+        frame[region] = blended[:, :, :3]
+        return frame
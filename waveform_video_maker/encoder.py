@@ -0,0 +1,111 @@
+# Output stage: raw RGB frames are piped straight into an ffmpeg process.
+# Title cards are encoded as separate segments with the same settings and
+# joined to the waveform segment by stream copy, without re-encoding.
+import os
+import subprocess
+import tempfile
+
+from .video_source import ffmpeg_binary
+
+AUDIO_RATE = 44100  # Same rate MoviePy writes; every segment must match for stream copy
+
+
+def video_codec_args(settings):
+    args = ["-c:v", settings.codec, "-pix_fmt", "yuv420p"]
+    if settings.preset:
+        args += ["-preset", settings.preset]
+    if settings.crf is not None:
+        args += ["-crf", str(settings.crf)]
+    if settings.encode_threads:
+        args += ["-threads", str(settings.encode_threads)]
+    return args
+
+
+def audio_codec_args():
+    return ["-c:a", "aac", "-ar", str(AUDIO_RATE), "-ac", "2"]
+
+
+def _run_ffmpeg(args):
+    result = subprocess.run([ffmpeg_binary(), "-y", "-v", "error"] + args, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE)
+    if result.returncode:
+        raise IOError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def encode_audio(audio_file, output, start=0, duration=None):
+    # The soundtrack alone, for outputs that share it (see FFmpegWriter's audio_args)
+    args = []
+    if start:
+        args += ["-ss", str(start)]
+    if duration is not None:
+        args += ["-t", str(duration)]
+    _run_ffmpeg(args + ["-i", audio_file, "-vn"] + audio_codec_args() + [output])
+
+
+class FFmpegWriter:
+    def __init__(self, output, size, fps, codec_args, audio_file=None, audio_start=0, audio_duration=None,
+                 audio_args=None):
+        width, height = size
+        self.output = output
+        args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-"]
+        if audio_file:
+            if audio_start:
+                args += ["-ss", str(audio_start)]
+            if audio_duration is not None:
+                args += ["-t", str(audio_duration)]
+            args += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"]
+            args += (audio_args or audio_codec_args()) + ["-shortest"]
+        args += codec_args + [output]
+
+        # ffmpeg's messages go to a file: a full stderr pipe would block the encoder
+        self._log = tempfile.TemporaryFile()
+        self._process = subprocess.Popen([ffmpeg_binary(), "-y", "-v", "error"] + args,
+                                         stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._log)
+
+    def write(self, frame):
+        try:
+            self._process.stdin.write(memoryview(frame).cast('B'))
+        except BrokenPipeError:
+            self._process.wait()
+            raise IOError(f"ffmpeg stopped: {self._messages()}")
+
+    def close(self):
+        self._process.stdin.close()
+        if self._process.wait():
+            raise IOError(f"ffmpeg failed: {self._messages()}")
+        self._log.close()
+
+    def abort(self):
+        # Stops the encoder and removes the partial output
+        self._process.kill()
+        self._process.wait()
+        self._log.close()
+        if os.path.exists(self.output):
+            os.remove(self.output)
+
+    def _messages(self):
+        self._log.seek(0)
+        return self._log.read().decode(errors='replace').strip()
+
+
+def encode_title_card(image, output, size, fps, duration, fade, codec_args):
+    # A still image with a silent soundtrack, fading "in" or "out" over its
+    # whole duration like the MoviePy fadein/fadeout effects
+    width, height = size
+    _run_ffmpeg(["-loop", "1", "-framerate", str(fps), "-t", str(duration), "-i", image,
+                 "-f", "lavfi", "-t", str(duration), "-i", f"anullsrc=r={AUDIO_RATE}:cl=stereo",
+                 "-vf", f"scale={width}:{height},fade=t={fade}:st=0:d={duration}",
+                 "-r", str(fps)] + codec_args + audio_codec_args() + ["-shortest", output])
+
+
+def concat_segments(segments, output):
+    # Joins segments with identical encoder settings without re-encoding
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        for segment in segments:
+            escaped = os.path.abspath(segment).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_file = f.name
+    try:
+        _run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy", output])
+    finally:
+        os.remove(list_file)
@@ -0,0 +1,599 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from .audio import FrameWindows, load_audio_range
+from .bloom import BloomFilter, layer_fill
+from .compositor import Background, Compositor, load_background_image, solid_background
+from .encoder import FFmpegWriter, concat_segments, encode_audio, encode_title_card, video_codec_args
+from .layer_cache import LayerCache, layer_key
+from .parallel import OrderedFrameSource, frame_count
+from .peaks import PeakWindows, load_peaks
+from .profiling import NULL_PROFILE, RenderProfile, report_path, write_report
+from .raster import WaveformRasterizer
+from .video_source import MEMORY_CACHE_LIMIT, BackgroundVideoSource
+
+# matplotlib, MoviePy and the PIL filters are imported by the code paths that
+# use them, so importing the package (and starting the interface) stays fast
+
+# Global variables for the linear waveform adjustments
+waveform_horizontal_offset = 0  # Adjust to shift waveform left/right
+waveform_vertical_scale = 1.0   # Adjust to scale waveform height
+
+TITLE_CARD_DURATION = 1.5
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+class FrameRenderer:
+    # Draws waveform frames for one job. Owns its figure/canvas, so every
+    # process (or job) that renders frames needs its own instance.
+    # `scale` draws everything (size, line widths, blur) at a fraction of the
+    # output resolution, for previews. Renderers of the same audio and fps can
+    # share one FrameWindows, and renderers of the same audio one PeakPyramid.
+    def __init__(self, settings, y, sr, duration, background_clip=None, scale=1.0, profile=NULL_PROFILE,
+                 windows=None, peaks=None):
+        self.settings = settings
+        self.profile = profile
+        self.y = y
+        self.sr = sr
+        self.duration = duration
+        self.background_clip = background_clip
+        self.video_width, self.video_height = (int(round(v * scale)) for v in settings.video_size)
+        size = (self.video_width, self.video_height)
+        # Line widths and blur are set for 1080p
+        self.scale = scale = scale * settings.render_scale
+        self.blur_radius = settings.blur_radius * scale
+
+        self.bloom = None
+        if settings.fast_bloom:
+            self.bloom = BloomFilter(self.video_width, self.video_height, self.blur_radius,
+                                     settings.bloom_intensity, layer_fill(settings.bg_color))
+
+        # Static backgrounds are decoded once; only video backgrounds change per frame
+        self.compositor = Compositor(self.video_width, self.video_height)
+        if settings.background_image:
+            self.background = load_background_image(settings.background_image, size)
+        elif background_clip:
+            self.background = None
+        else:
+            self.background = solid_background(settings.bg_color, size)
+
+        # Sample window of every frame. Wide windows are drawn from the peak
+        # pyramid at about one point per pixel along the waveform.
+        if settings.waveform_window:
+            if settings.circle_waveform:
+                columns = np.pi * min(self.video_width, self.video_height) / 2
+            else:
+                columns = self.video_width
+            self.windows = PeakWindows(y, sr, settings.fps, duration, settings.waveform_window, columns,
+                                       peaks or load_peaks(settings.audio_file, y, sr, settings.start_time,
+                                                           settings.cache_dir))
+        else:
+            self.windows = windows or FrameWindows(y, sr, settings.fps, duration)
+
+        # Finished waveform layers from earlier renders with the same look
+        self.layer_cache = None
+        if settings.layer_cache:
+            settings.validate()
+            key = layer_key(settings, size, (waveform_horizontal_offset, waveform_vertical_scale))
+            self.layer_cache = LayerCache(settings.cache_dir, key, self.video_width, self.video_height)
+
+        # The last drawn layer and the window it was drawn from: frames whose
+        # window is the same (or silent, like the last one) reuse it
+        self.last_layer = None
+        self.last_window = None
+
+        dpi_value = 100 * scale  # Line widths are in points, so they follow the dpi
+        if settings.renderer == "numpy":
+            self.rasterizer = WaveformRasterizer(self.video_width, self.video_height, settings.bg_color, dpi_value)
+        elif settings.renderer == "matplotlib":
+            # Prepare figure for plotting
+            self.fig, self.canvas = _take_figure(self.video_width, self.video_height, dpi_value)
+        else:
+            raise ValueError(f"Unknown renderer: {settings.renderer}")
+
+    def make_frame(self, t):
+        s = self.settings
+
+        frame_number = self.windows.frame_at(t)
+        y_frame = self.windows[frame_number]
+
+        if s.skip_duplicate_frames:
+            if s.silence_threshold and np.abs(y_frame).max(initial=0) <= s.silence_threshold:
+                # Near-silent windows are all drawn as a flat line
+                y_frame = np.zeros_like(y_frame)
+            if self.last_window is not None and np.array_equal(y_frame, self.last_window):
+                if self.background is not None:
+                    # Same layer over the same background: the last frame is still in the compositor
+                    return self.compositor.frame
+                return self.composite_layer(*self.last_layer, t)
+            self.last_window = y_frame
+
+        if self.layer_cache:
+            with self.profile.stage("layer_load"):
+                cached = self.layer_cache.load(frame_number)
+            if cached:
+                layer, box, outside = cached
+                self.last_layer = layer, box if outside >> 24 == 0 else None
+                return self.composite_layer(*self.last_layer, t)
+
+        if s.renderer == "numpy":
+            with self.profile.stage("raster"):
+                base_img = self.raster_waveform(y_frame)
+        else:
+            base_img = self.plot_waveform(y_frame)
+
+        return self.finish_frame(base_img, t, frame_number)
+
+    def iter_frames(self):
+        # Every frame of the clip in order, at the times MoviePy would use
+        fps = self.settings.fps
+        for frame_index in range(frame_count(self.duration, fps)):
+            yield self.make_frame(frame_index / fps)
+
+    def raster_waveform(self, y_frame):
+        s = self.settings
+        rasterizer = self.rasterizer
+        rasterizer.clear()
+        if s.circle_waveform:
+            raster_circle_waveform(rasterizer, y_frame, s.wf_color, s.first_waveform_scale, s.second_waveform_color,
+                                   s.second_waveform_scale, s.line_thickness, s.draw_second_circle)
+        else:
+            raster_linear_waveform(rasterizer, y_frame, s.wf_color, s.line_thickness, self.video_width * 2)
+        return rasterizer.buffer
+
+    def plot_waveform(self, y_frame):
+        s = self.settings
+        video_width, video_height = self.video_width, self.video_height
+        fig = self.fig
+        profile = self.profile
+
+        with profile.stage("draw"):
+            # Clear previous plot
+            fig.clf()
+
+            # Create new axes based on the waveform type
+            if s.circle_waveform:
+                ax = fig.add_subplot(111, polar=True)
+            else:
+                ax = fig.add_subplot(111)
+
+            # Set background color
+            if s.bg_color.lower() == "#000000":
+                ax.set_facecolor('none')
+                fig.patch.set_alpha(0.0)
+            else:
+                ax.set_facecolor(s.bg_color)
+                fig.patch.set_facecolor(s.bg_color)
+
+            # Draw the appropriate waveform
+            if s.circle_waveform:
+                draw_circle_waveform(ax, y_frame, s.wf_color, s.first_waveform_scale, s.second_waveform_color,
+                                     s.second_waveform_scale, s.line_thickness, s.draw_second_circle)
+            else:
+                draw_linear_waveform(ax, y_frame, s.wf_color, s.line_thickness, video_width * 2)  # Overdraw width
+
+            # Remove margins and padding
+            fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
+            ax.margins(0)
+            ax.axis('off')
+
+            # Convert plot to image with transparency
+            self.canvas.draw()
+
+        # Use buffer_rgba() to retain transparency
+        with profile.stage("canvas_copy"):
+            waveform_img = np.asarray(self.canvas.buffer_rgba())
+
+        if s.circle_waveform:
+            # No need to resize, the figure matches the video dimensions
+            return waveform_img
+
+        # For linear waveform, resize the overdrawn image to video dimensions
+        from PIL import Image
+        with profile.stage("resize"):
+            return np.array(Image.fromarray(waveform_img).resize((video_width, video_height)))
+
+    def finish_frame(self, base_img, t, frame_number=None):
+        s = self.settings
+        profile = self.profile
+
+        with profile.stage("bloom"):
+            if self.bloom:
+                final_image = self.bloom.apply(base_img)
+            else:
+                from PIL import Image, ImageChops, ImageFilter
+
+                # Create the glow layer
+                pil_base_image = Image.fromarray(base_img)
+                glow_layer = pil_base_image.filter(ImageFilter.GaussianBlur(self.blur_radius))
+
+                # Blend the glow layer with the base image
+                glow_intensity_np = (np.array(glow_layer) * s.bloom_intensity).astype(np.uint8)
+                combined_img = ImageChops.add(pil_base_image, Image.fromarray(glow_intensity_np))
+
+                # Convert combined image to numpy array
+                final_image = np.array(combined_img)
+
+        if self.layer_cache and frame_number is not None:
+            with profile.stage("layer_store"):
+                if self.bloom:
+                    self.layer_cache.store(frame_number, final_image, self.bloom.box, self.bloom.outside)
+                else:
+                    self.layer_cache.store(frame_number, final_image)
+
+        # Only the bloomed region needs blending when the rest of the layer is transparent
+        box = self.bloom.box if self.bloom and self.bloom.outside_transparent else None
+        self.last_layer = final_image, box
+        return self.composite_layer(final_image, box, t)
+
+    def composite_layer(self, layer, box, t):
+        # Overlay the final image on the background
+        if self.background is not None:
+            background = self.background
+        else:
+            with self.profile.stage("background"):
+                background = Background(self.background_clip.get_frame(t), keep_rgba=False)
+
+        with self.profile.stage("composite"):
+            return self.compositor.composite(layer, background, box)
+
+    def close(self):
+        if self.background_clip:
+            self.background_clip.close()
+        if self.settings.renderer == "matplotlib":
+            # Transparent layers leave the figure background see-through
+            self.fig.patch.set_alpha(None)
+            _figures.setdefault((self.video_width, self.video_height, 100 * self.scale), (self.fig, self.canvas))
+
+
+# Figures of closed renderers by (width, height, dpi), reused by the next
+# renderer of the same size so long-lived processes don't rebuild them per job
+_figures = {}
+
+
+def _take_figure(width, height, dpi_value):
+    figure = _figures.pop((width, height, dpi_value), None)
+    if figure is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(width / dpi_value, height / dpi_value), dpi=dpi_value)
+        figure = fig, FigureCanvasAgg(fig)
+    return figure
+
+
+def load_audio(settings):
+    # Load only the part of the audio file being rendered
+    y, sr = load_audio_range(settings.audio_file, settings.start_time, settings.limit_duration, settings.cache_dir)
+    duration = len(y) / sr
+    return y, sr, duration
+
+
+def load_background_clip(settings, duration=None, memory_limit=MEMORY_CACHE_LIMIT):
+    # Check for background video. With the render's duration, a longer clip
+    # is only decoded as far as the render goes.
+    if not settings.background_video:
+        return None
+    try:
+        background_clip = BackgroundVideoSource(settings.background_video, settings.video_size, settings.fps,
+                                                memory_limit, max_duration=duration)
+        print(f"Background video duration: {background_clip.duration} seconds")
+        return background_clip
+    except Exception as e:
+        print(f"Error loading background video: {e}")
+        return None
+
+
+def render_video(settings, logger='bar', progress=None, cancel=None):
+    # progress(done, total) is called after every frame; setting the `cancel`
+    # event (threading.Event) stops the render with RenderCancelled.
+    # With settings.profile, a timing report is written next to the output.
+    # Returns the output file, or the list of them for settings.renditions.
+    outputs = settings.expand_renditions()
+    if not settings.audio_file or not all(output.output_file for output in outputs):
+        raise ValueError("Please select both audio and output files.")
+    if len(outputs) > 1 and settings.encoder != "ffmpeg":
+        raise ValueError("Renditions are only written by the ffmpeg encoder")
+
+    started = time.perf_counter()
+    profile = RenderProfile() if settings.profile else NULL_PROFILE
+    with profile.stage("audio_load"):
+        y, sr, duration = load_audio(settings)
+
+    workers = settings.workers
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # Pool workers (e.g. the batch CLI) can't start processes of their own
+        print("Parallel frame rendering is not available inside a worker process, rendering serially")
+        workers = 1
+    # Renditions split the frame workers between them
+    workers = max(1, workers // len(outputs))
+
+    peaks = None
+    if any(output.waveform_window for output in outputs):
+        # Built (or loaded from the cache) once here and shared by every
+        # rendition and frame worker
+        with profile.stage("peaks"):
+            peaks = load_peaks(settings.audio_file, y, sr, settings.start_time, settings.cache_dir)
+
+    frame_sources = []
+    windows = {}  # Shared by the renditions with the same fps
+    try:
+        for output in outputs:
+            if workers > 1:
+                frame_source = OrderedFrameSource(output, y, sr, duration, workers, output.chunk_frames, profile,
+                                                  peaks)
+            else:
+                if output.fps not in windows:
+                    windows[output.fps] = FrameWindows(y, sr, output.fps, duration)
+                frame_source = FrameRenderer(output, y, sr, duration, load_background_clip(output, duration),
+                                             profile=profile, windows=windows[output.fps], peaks=peaks)
+            frame_sources.append(frame_source)
+
+        if settings.encoder == "ffmpeg":
+            _write_video_ffmpeg(outputs, frame_sources, duration, logger, progress, cancel, profile)
+        elif settings.encoder == "moviepy":
+            _write_video_moviepy(settings, frame_sources[0], duration, logger, progress, cancel, profile)
+        else:
+            raise ValueError(f"Unknown encoder: {settings.encoder}")
+    finally:
+        for frame_source in frame_sources:
+            frame_source.close()
+
+    if profile.enabled:
+        path = report_path(outputs[0].output_file)
+        report = write_report(path, profile, settings, sum(frame_count(duration, output.fps) for output in outputs),
+                              time.perf_counter() - started)
+        print(f"Rendered {report['frames']} frames at {report['fps']:.1f} fps, report written to {path}")
+
+    if settings.renditions:
+        return [output.output_file for output in outputs]
+    return settings.output_file
+
+
+def _check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled("Rendering was cancelled")
+
+
+def _write_video_ffmpeg(outputs, frame_sources, duration, logger, progress=None, cancel=None, profile=NULL_PROFILE):
+    # Frames go straight from each renderer into its own ffmpeg process. The
+    # outputs advance together in time order, so they all finish together.
+    # Several outputs share one AAC encode of the soundtrack. Title cards are
+    # encoded on their own and joined to the waveform by stream copy.
+    work_dirs = []
+    writers = []
+    try:
+        first = outputs[0]
+        audio_file, audio_start, audio_duration, audio_args = first.audio_file, first.start_time, duration, None
+        if len(outputs) > 1:
+            audio_dir = tempfile.mkdtemp(prefix="wvm-audio-")
+            work_dirs.append(audio_dir)
+            audio_file = os.path.join(audio_dir, "audio.m4a")
+            with profile.stage("audio_encode"):
+                encode_audio(first.audio_file, audio_file, first.start_time, duration)
+            audio_start, audio_duration, audio_args = 0, None, ["-c:a", "copy"]
+
+        frames = [frame_source.iter_frames() for frame_source in frame_sources]
+        totals = [frame_count(duration, output.fps) for output in outputs]
+        positions = [0] * len(outputs)
+        total = sum(totals)
+        from proglog import default_bar_logger
+        bar = default_bar_logger(logger)
+        try:
+            segments = []  # Per output: (waveform file, title cards, work dir)
+            for output in outputs:
+                title_cards = [(image, fade) for image, fade in ((output.title_card_start, "out"),
+                                                                 (output.title_card_end, "in")) if image]
+                work_dir = None
+                if title_cards:
+                    # Next to the output, so the segments aren't copied across file systems
+                    work_dir = tempfile.mkdtemp(prefix="wvm-segments-",
+                                                dir=os.path.dirname(os.path.abspath(output.output_file)))
+                    work_dirs.append(work_dir)
+                ext = os.path.splitext(output.output_file)[1] or ".mp4"
+                waveform_output = os.path.join(work_dir, "waveform" + ext) if work_dir else output.output_file
+                segments.append((waveform_output, title_cards, work_dir))
+                writers.append(FFmpegWriter(waveform_output, output.video_size, output.fps, video_codec_args(output),
+                                            audio_file, audio_start, audio_duration, audio_args))
+
+            for done in bar.iter_bar(frame_index=range(total)):
+                _check_cancelled(cancel)
+                # The output whose next frame is earliest
+                i = min((k for k in range(len(outputs)) if positions[k] < totals[k]),
+                        key=lambda k: positions[k] / outputs[k].fps)
+                # With frame workers, "frame" is the time spent waiting for them
+                with profile.stage("frame"):
+                    frame = next(frames[i])
+                with profile.stage("encode"):
+                    writers[i].write(frame)
+                positions[i] += 1
+                if progress:
+                    progress(done + 1, total)
+            # Stops frame worker processes before any encoder is closed: they
+            # inherit the pipes to ffmpeg, which would otherwise never see the
+            # end of their input
+            for frame_iter in frames:
+                frame_iter.close()
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            raise
+        with profile.stage("encode_finish"):
+            for writer in writers:
+                writer.close()
+
+        for output, (waveform_output, title_cards, work_dir) in zip(outputs, segments):
+            if not work_dir:
+                continue
+            ext = os.path.splitext(waveform_output)[1]
+            parts = [waveform_output]
+            for image, fade in title_cards:
+                segment = os.path.join(work_dir, f"title_{fade}" + ext)
+                with profile.stage("title_card"):
+                    encode_title_card(image, segment, output.video_size, output.fps, TITLE_CARD_DURATION, fade,
+                                      video_codec_args(output))
+                if fade == "out":
+                    parts.insert(0, segment)
+                else:
+                    parts.append(segment)
+            with profile.stage("concat"):
+                concat_segments(parts, output.output_file)
+    finally:
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _write_video_moviepy(settings, frame_source, duration, logger, progress=None, cancel=None,
+                         profile=NULL_PROFILE):
+    from moviepy.editor import AudioFileClip, ImageClip, VideoClip, concatenate_videoclips
+
+    video_width, video_height = settings.video_size
+    fps = settings.fps
+    total = frame_count(duration, fps)
+    written = 0
+
+    def make_frame(t):
+        nonlocal written
+        _check_cancelled(cancel)
+        with profile.stage("frame"):
+            frame = frame_source.make_frame(t)
+        written += 1
+        if progress:
+            progress(min(written, total), total)
+        return frame
+
+    # Generate video clip using MoviePy; frames are already at the output size
+    video_clip = VideoClip(make_frame, duration=duration).set_fps(fps)
+
+    # Add audio to the video
+    audio_clip = AudioFileClip(settings.audio_file)
+    if settings.start_time or settings.limit_duration:
+        # Use the truncated waveform duration
+        audio_clip = audio_clip.subclip(settings.start_time, settings.start_time + duration)
+
+    video_clip = video_clip.set_audio(audio_clip)
+
+    # Handle title card clips if provided
+    clips = []
+    if settings.title_card_start:
+        start_image_clip = ImageClip(settings.title_card_start).set_duration(TITLE_CARD_DURATION) \
+            .resize((video_width, video_height)).fadeout(TITLE_CARD_DURATION)
+        clips.append(start_image_clip)
+
+    clips.append(video_clip)  # Always add the main waveform video
+
+    if settings.title_card_end:
+        end_image_clip = ImageClip(settings.title_card_end).set_duration(TITLE_CARD_DURATION) \
+            .resize((video_width, video_height)).fadein(TITLE_CARD_DURATION)
+        clips.append(end_image_clip)
+
+    # Combine the clips (with or without title cards)
+    final_clip = concatenate_videoclips(clips, method="compose")
+
+    # Write the video file
+    ffmpeg_params = ["-crf", str(settings.crf)] if settings.crf is not None else None
+    # MoviePy encodes the soundtrack to a file of its own first, next to the
+    # current directory by default; a cancelled render would leave it behind
+    audio_dir = tempfile.mkdtemp(prefix="wvm-audio-")
+    temp_audiofile = os.path.join(audio_dir, "audio.m4a")
+    try:
+        # Encoding isn't timed separately here: MoviePy interleaves it with make_frame
+        final_clip.write_videofile(settings.output_file, fps=fps, codec=settings.codec, audio_codec='aac',
+                                   temp_audiofile=temp_audiofile, threads=settings.encode_threads,
+                                   preset=settings.preset, ffmpeg_params=ffmpeg_params, logger=logger)
+    except RenderCancelled:
+        if os.path.exists(settings.output_file):
+            os.remove(settings.output_file)
+        raise
+    finally:
+        final_clip.close()
+        audio_clip.close()
+        shutil.rmtree(audio_dir, ignore_errors=True)
+
+
+def draw_linear_waveform(ax, y_frame, wf_color, current_thickness, overdrawn_width):
+    # Linear waveform
+    x_values = np.linspace(0, overdrawn_width, len(y_frame)) + waveform_horizontal_offset
+
+    y_smoothed = y_frame
+
+    # Scale the waveform vertically
+    y_smoothed_scaled = y_smoothed * waveform_vertical_scale
+
+    # Plot the waveform
+    for i in range(5, 0, -1):
+        ax.plot(x_values, y_smoothed_scaled, color=wf_color,
+                linewidth=current_thickness * (i * 0.5), alpha=0.1 * i)
+
+    ax.plot(x_values, y_smoothed_scaled, color=wf_color, linewidth=current_thickness)
+
+    # Set axes limits
+    ax.set_xlim(0, overdrawn_width)
+    ax.set_ylim(-1 * waveform_vertical_scale, 1 * waveform_vertical_scale)
+
+    # Disable automatic scaling
+    ax.autoscale(False)
+    ax.axis('off')
+
+
+def raster_linear_waveform(rasterizer, y_frame, wf_color, current_thickness, overdrawn_width):
+    # NumPy counterpart of draw_linear_waveform
+    x, y = rasterizer.linear_points(y_frame * waveform_vertical_scale, waveform_horizontal_offset,
+                                    waveform_vertical_scale, overdrawn_width)
+    rasterizer.draw_polyline(x, y, wf_color, current_thickness)
+
+
+def raster_circle_waveform(rasterizer, y_frame, wf_color, first_waveform_scale, second_waveform_color, second_waveform_scale, current_thickness, draw_second_circle):
+    # NumPy counterpart of draw_circle_waveform
+    y_frame_smoothed = np.concatenate([y_frame, [y_frame[0]]])
+    theta_smoothed = np.linspace(0, 2 * np.pi, len(y_frame_smoothed))
+    base_radius = 1
+    r_max = (base_radius + 1) * max(first_waveform_scale, second_waveform_scale)
+
+    if draw_second_circle:
+        x, y = rasterizer.polar_points(theta_smoothed, (base_radius + y_frame_smoothed) * second_waveform_scale, r_max)
+        rasterizer.draw_polyline(x, y, second_waveform_color, current_thickness)
+
+    x, y = rasterizer.polar_points(theta_smoothed, (base_radius + y_frame_smoothed) * first_waveform_scale, r_max)
+    rasterizer.draw_polyline(x, y, wf_color, current_thickness)
+
+
+def draw_circle_waveform(ax, y_frame, wf_color, first_waveform_scale, second_waveform_color, second_waveform_scale, current_thickness, draw_second_circle):
+    # Circular (polar) waveform
+    theta = np.linspace(0, 2 * np.pi, len(y_frame))
+
+    # Smoothly connect the start and end points
+    y_frame_smoothed = np.concatenate([y_frame, [y_frame[0]]])
+    theta_smoothed = np.linspace(0, 2 * np.pi, len(y_frame_smoothed))
+
+    # Base radius for the waveform
+    base_radius = 1
+
+    # Draw the second (larger) waveform by scaling the radius if enabled
+    if draw_second_circle:
+        for i in range(5, 0, -1):
+            ax.plot(theta_smoothed, (base_radius + y_frame_smoothed) * second_waveform_scale,
+                    color=second_waveform_color, linewidth=current_thickness * (i * 0.5), alpha=0.1 * i)
+        ax.plot(theta_smoothed, (base_radius + y_frame_smoothed) * second_waveform_scale,
+                color=second_waveform_color, linewidth=current_thickness)
+
+    # Draw the first waveform
+    for i in range(5, 0, -1):
+        ax.plot(theta_smoothed, (base_radius + y_frame_smoothed) * first_waveform_scale,
+                color=wf_color, linewidth=current_thickness * (i * 0.5), alpha=0.1 * i)
+    ax.plot(theta_smoothed, (base_radius + y_frame_smoothed) * first_waveform_scale,
+            color=wf_color, linewidth=current_thickness)
+
+    # Set the limits to ensure everything fits in the plot
+    ax.set_ylim([0, (base_radius + 1) * max(first_waveform_scale, second_waveform_scale)])
+    ax.set_xlim([0, 2 * np.pi])
+    ax.grid(False)
+    ax.set_axis_off()
+
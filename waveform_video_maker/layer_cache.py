@@ -0,0 +1,76 @@
+# On-disk cache of the finished waveform layer (waveform plus bloom) of every
+# frame. Entries are keyed by the audio and every setting that changes the
+# layer, so a later render that only changes the background, title cards or
+# output skips drawing and blurring and goes straight to compositing.
+#
+# Each frame is one file: the bounding box of the drawn region, the colour of
+# everything outside it, and the region itself, zlib-compressed.
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from .audio import file_digest, replace_atomically
+
+# Bump when the drawing code changes what a layer looks like
+LAYER_VERSION = 1
+
+# Settings that change the waveform layer; everything else only changes compositing
+LAYER_FIELDS = ("bg_color", "wf_color", "second_waveform_color", "circle_waveform", "draw_second_circle",
+                "line_thickness", "first_waveform_scale", "second_waveform_scale", "waveform_window", "renderer",
+                "blur_radius", "bloom_intensity", "fast_bloom", "skip_duplicate_frames", "silence_threshold", "fps",
+                "start_time", "limit_duration")
+
+FRAMES_PER_DIR = 1000
+HEADER = struct.Struct("<4sIIIII")  # magic, outside colour, x0, y0, x1, y1
+MAGIC = b"WVL1"
+
+
+def layer_key(settings, size, extra=()):
+    # Content address of one render's layers
+    values = {name: getattr(settings, name) for name in LAYER_FIELDS}
+    values.update(version=LAYER_VERSION, audio=file_digest(settings.audio_file), size=list(size), extra=list(extra))
+    return hashlib.blake2b(json.dumps(values, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+
+class LayerCache:
+    def __init__(self, cache_dir, key, width, height):
+        self.directory = os.path.join(cache_dir, "layers", key)
+        self.width = width
+        self.height = height
+        self.buffer = np.empty((height, width, 4), dtype=np.uint8)
+
+    def path(self, frame_index):
+        return os.path.join(self.directory, f"{frame_index // FRAMES_PER_DIR:05d}", f"{frame_index:08d}.layer")
+
+    def load(self, frame_index):
+        # (layer, box, outside colour) of a cached frame, or None. The layer is
+        # a buffer reused by the next call.
+        try:
+            with open(self.path(frame_index), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        magic, outside, x0, y0, x1, y1 = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            return None
+        region = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype=np.uint8)
+        layer = self.buffer
+        layer.view(np.uint32).fill(outside)
+        layer[y0:y1, x0:x1] = region.reshape(y1 - y0, x1 - x0, 4)
+        return layer, (x0, y0, x1, y1), outside
+
+    def store(self, frame_index, layer, box=None, outside=0):
+        # Everything outside `box` (x0, y0, x1, y1) must be the `outside` colour
+        x0, y0, x1, y1 = box if box is not None else (0, 0, self.width, self.height)
+        region = np.ascontiguousarray(layer[y0:y1, x0:x1])
+        path = self.path(frame_index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with replace_atomically(path) as f:
+            f.write(HEADER.pack(MAGIC, int(outside), x0, y0, x1, y1))
+            f.write(zlib.compress(region, 1))
@@ -0,0 +1,198 @@
+# Parallel frame rendering: the timeline is split into chunks of frames that
+# worker processes render into a ring of shared-memory slots. The parent hands
+# the frames to the encoder in order, and only ever has as many chunks in
+# flight as there are slots, so memory stays bounded however long the audio is.
+# The ring has one slot per worker plus one, and chunks shrink until it fits
+# in RING_MEMORY_LIMIT, so the bound doesn't grow with the worker count.
+import multiprocessing
+import os
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .profiling import NULL_PROFILE, RenderProfile
+from .video_source import BackgroundVideoSource
+
+# Most shared memory the ring of frame slots may take
+RING_MEMORY_LIMIT = 512 << 20
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+
+def frame_count(duration, fps):
+    # Same frame times MoviePy iterates over when writing the clip
+    return len(np.arange(0, duration, 1.0 / fps))
+
+
+def ring_memory_limit(reserved=0):
+    # RING_MEMORY_LIMIT, and on Linux at most half of what /dev/shm (often
+    # only 64 MB in containers) has left once `reserved` bytes are written:
+    # running out of it kills the workers with SIGBUS
+    limit = RING_MEMORY_LIMIT
+    if os.path.isdir("/dev/shm"):
+        stat = os.statvfs("/dev/shm")
+        limit = min(limit, (stat.f_bavail * stat.f_frsize - reserved) // 2)
+    return limit
+
+
+def _init_worker(settings, audio_name, audio_shape, sr, duration, slots_name, slot_shape, background, peaks):
+    from .engine import FrameRenderer
+
+    audio_shm = shared_memory.SharedMemory(name=audio_name)
+    y = np.ndarray(audio_shape, dtype=np.float32, buffer=audio_shm.buf)
+    y.flags.writeable = False
+
+    slots_shm = shared_memory.SharedMemory(name=slots_name)
+    slots = np.ndarray(slot_shape, dtype=np.uint8, buffer=slots_shm.buf)
+
+    # Each worker owns its figure/canvas (or rasterizer); the background video
+    # loop is decoded once by the parent and mapped read-only
+    background_clip = BackgroundVideoSource.attach(background) if background else None
+    profile = RenderProfile() if settings.profile else NULL_PROFILE
+    _worker.update(
+        renderer=FrameRenderer(settings, y, sr, duration, background_clip, profile=profile, peaks=peaks),
+        slots=slots,
+        fps=settings.fps,
+        # Keep the mappings alive for the lifetime of the worker
+        shm=(audio_shm, slots_shm),
+    )
+
+
+def _render_chunk(slot, first, last):
+    renderer, slots, fps = _worker["renderer"], _worker["slots"], _worker["fps"]
+    for k, frame_index in enumerate(range(first, last)):
+        slots[slot, k] = renderer.make_frame(frame_index / fps)
+    # Stage timings go back to the parent with the chunk
+    return last - first, renderer.profile.take()
+
+
+def iter_frames_parallel(settings, y, sr, duration, workers, chunk_frames=12, max_inflight=None, background=None,
+                         profile=NULL_PROFILE, peaks=None):
+    # Yields every frame of the clip in order. Each yielded array is a view into
+    # shared memory and is only valid until the next frame is requested.
+    video_width, video_height = settings.video_size
+    total = frame_count(duration, settings.fps)
+    audio = np.ascontiguousarray(y, dtype=np.float32)
+
+    # Every worker fills a slot while the encoder reads one more. Chunks
+    # shrink (down to one frame) and then slots are dropped until the ring
+    # fits in its memory limit.
+    frame_bytes = video_width * video_height * 3
+    limit = ring_memory_limit(reserved=audio.nbytes)
+    slot_count = max(1, min(max_inflight or workers + 1, -(-total // chunk_frames)))
+    chunk_frames = max(1, min(chunk_frames, limit // (slot_count * frame_bytes)))
+    chunks = [(first, min(first + chunk_frames, total)) for first in range(0, total, chunk_frames)]
+    slot_count = max(1, min(slot_count, len(chunks), limit // (chunk_frames * frame_bytes)))
+    slot_shape = (slot_count, chunk_frames, video_height, video_width, 3)
+
+    audio_shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+    slots_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(slot_shape)))
+    pool = None
+    try:
+        np.ndarray(audio.shape, dtype=np.float32, buffer=audio_shm.buf)[:] = audio
+        slots = np.ndarray(slot_shape, dtype=np.uint8, buffer=slots_shm.buf)
+
+        pool = multiprocessing.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(settings, audio_shm.name, audio.shape, sr, duration, slots_shm.name, slot_shape, background,
+                      peaks),
+        )
+
+        pending = deque()
+        free_slots = deque(range(slot_count))
+        next_chunk = 0
+        while next_chunk < len(chunks) or pending:
+            # Keep every free slot busy
+            while free_slots and next_chunk < len(chunks):
+                slot = free_slots.popleft()
+                first, last = chunks[next_chunk]
+                pending.append((slot, pool.apply_async(_render_chunk, (slot, first, last))))
+                next_chunk += 1
+
+            # Hand out the oldest chunk before its slot is reused
+            slot, result = pending.popleft()
+            count, samples = result.get()
+            profile.merge(samples)
+            for k in range(count):
+                yield slots[slot, k]
+            free_slots.append(slot)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        slots = None
+        audio_shm.close()
+        audio_shm.unlink()
+        slots_shm.close()
+        slots_shm.unlink()
+
+
+class OrderedFrameSource:
+    # Serves the ordered frame stream to the encoder, either directly through
+    # iter_frames() or through MoviePy's make_frame(t) interface.
+    # Frames are expected in order; anything else (a repeated or earlier frame)
+    # is rendered locally.
+    def __init__(self, settings, y, sr, duration, workers, chunk_frames=12, profile=NULL_PROFILE, peaks=None):
+        self.settings = settings
+        self.args = (settings, y, sr, duration)
+        self.workers = workers
+        self.chunk_frames = chunk_frames
+        self.profile = profile
+        # Handed to every worker, which would otherwise build its own
+        self.peaks = peaks
+        self.total = frame_count(duration, settings.fps)
+        self.frames = None
+        self.position = -1
+        self.last_frame = None
+        self.local_renderer = None
+
+        # Decode the background video loop once, to a file the workers can map
+        from .engine import load_background_clip
+        self.background_clip = load_background_clip(settings, duration, memory_limit=0)
+        self.background = self.background_clip.share() if self.background_clip else None
+
+    def iter_frames(self):
+        # Every frame in order, straight from shared memory: each one is only
+        # valid until the next is requested
+        if self.frames is not None:
+            raise RuntimeError("Frames are already being consumed")
+        self.frames = iter_frames_parallel(*self.args, workers=self.workers, chunk_frames=self.chunk_frames,
+                                           background=self.background, profile=self.profile, peaks=self.peaks)
+        return self.frames
+
+    def make_frame(self, t):
+        frame_index = min(int(round(t * self.settings.fps)), self.total - 1)
+        if frame_index == self.position:
+            return self.last_frame
+
+        if frame_index > self.position:
+            if self.frames is None:
+                self.frames = iter_frames_parallel(*self.args, workers=self.workers, chunk_frames=self.chunk_frames,
+                                                   background=self.background, profile=self.profile,
+                                                   peaks=self.peaks)
+            while self.position < frame_index:
+                frame = next(self.frames)
+                self.position += 1
+            # The shared slot is recycled later, keep our own copy
+            self.last_frame = frame.copy()
+            return self.last_frame
+
+        if self.local_renderer is None:
+            from .engine import FrameRenderer
+            background_clip = BackgroundVideoSource.attach(self.background) if self.background else None
+            self.local_renderer = FrameRenderer(*self.args, background_clip, profile=self.profile, peaks=self.peaks)
+        return self.local_renderer.make_frame(t)
+
+    def close(self):
+        if self.frames is not None:
+            self.frames.close()
+            self.frames = None
+        if self.local_renderer is not None:
+            self.local_renderer.close()
+            self.local_renderer = None
+        if self.background_clip is not None:
+            self.background_clip.close()
+            self.background_clip = None
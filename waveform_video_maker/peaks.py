@@ -0,0 +1,182 @@
+# Min/max/RMS peak pyramid for wide waveform windows. Level 0 summarises
+# blocks of BLOCK_SIZE samples and every level above halves the resolution,
+# so any window can be drawn from the level whose blocks are just narrower
+# than one output column. Per-frame cost then depends on the number of
+# columns, not on the window length or the track length. Once the whole
+# track's samples are cached, so is its pyramid, which then serves every range
+# rendered from it.
+import os
+
+import numpy as np
+
+from .audio import file_digest, is_cached, load_audio_range, replace_atomically
+
+BLOCK_SIZE = 64
+PEAK_VERSION = 1
+
+
+class PeakPyramid:
+    def __init__(self, levels, length, block_size=BLOCK_SIZE, offset=0):
+        # levels: list of (mins, maxs, mean squares) arrays, finest first.
+        # The pyramid is used for `length` samples from sample `offset` of
+        # the track it summarises (see slice()).
+        self.levels = levels
+        self.length = length
+        self.block_size = block_size
+        self.offset = offset
+
+    @classmethod
+    def build(cls, y, block_size=BLOCK_SIZE):
+        y = np.asarray(y, dtype=np.float32)
+        blocks = -(-len(y) // block_size)
+        padded = np.zeros(max(1, blocks) * block_size, dtype=np.float32)
+        padded[:len(y)] = y
+        padded = padded.reshape(-1, block_size)
+
+        mins, maxs = padded.min(axis=1), padded.max(axis=1)
+        squares = np.einsum('ij,ij->i', padded, padded) / block_size
+        levels = [(mins, maxs, squares)]
+        while len(mins) > 1:
+            if len(mins) % 2:
+                mins, maxs, squares = (np.append(a, a[-1]) for a in (mins, maxs, squares))
+            mins = np.minimum(mins[0::2], mins[1::2])
+            maxs = np.maximum(maxs[0::2], maxs[1::2])
+            squares = (squares[0::2] + squares[1::2]) / 2
+            levels.append((mins, maxs, squares))
+
+        # Half precision is plenty for drawing and halves the size on disk
+        return cls([tuple(a.astype(np.float16) for a in level) for level in levels], len(y), block_size)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != PEAK_VERSION:
+                return None
+            count = int(data["levels"])
+            levels = [(data[f"min{k}"], data[f"max{k}"], data[f"ms{k}"]) for k in range(count)]
+            return cls(levels, int(data["length"]), int(data["block_size"]))
+
+    def slice(self, offset, length):
+        # The same pyramid for the `length` samples from sample `offset` on:
+        # columns() then takes positions within that range
+        return PeakPyramid(self.levels, length, self.block_size, self.offset + offset)
+
+    def save(self, path):
+        arrays = {"version": PEAK_VERSION, "levels": len(self.levels), "length": self.length,
+                  "block_size": self.block_size}
+        for k, (mins, maxs, squares) in enumerate(self.levels):
+            arrays.update({f"min{k}": mins, f"max{k}": maxs, f"ms{k}": squares})
+        with replace_atomically(path) as f:
+            np.savez(f, **arrays)
+
+    def columns(self, y, start, stop, count):
+        # (mins, maxs, rms) of `count` equal columns over samples [start, stop)
+        # of the range. Columns outside it are silent. `y` is the range's
+        # samples, read directly when a column is narrower than one block.
+        samples_per_column = (stop - start) / count
+        if samples_per_column < self.block_size:
+            unit, (mins, maxs, squares) = 1, (y, y, None)
+            offset = 0
+        else:
+            level = 0
+            while level + 1 < len(self.levels) and self.block_size << (level + 1) <= samples_per_column:
+                level += 1
+            unit, (mins, maxs, squares) = self.block_size << level, self.levels[level]
+            offset = self.offset
+        first = offset // unit
+        available = min(len(mins), -(-(offset + self.length) // unit))
+
+        # Every column covers at least one unit, so narrow columns still show something
+        edges = (np.linspace(start, stop, count + 1) + offset) / unit
+        starts = np.clip(np.floor(edges[:-1]), first, available).astype(np.int64)
+        ends = np.clip(np.ceil(edges[1:]), first, available).astype(np.int64)
+        ends = np.maximum(ends, np.minimum(starts + 1, available))
+        inside = (starts < ends) & (edges[1:] > offset / unit)
+
+        result = np.zeros((3, count), dtype=np.float32)
+        if not inside.any():
+            return result
+        starts, ends = starts[inside], ends[inside]
+
+        # reduceat over interleaved (start, end) pairs reduces each column's own
+        # range; only the units under the window are touched
+        low, high = starts[0], ends[-1]
+        indices = np.empty(2 * len(starts), dtype=np.int64)
+        indices[0::2] = starts - low
+        indices[1::2] = ends - low
+
+        def reduce(ufunc, values):
+            values = np.append(np.asarray(values, dtype=np.float32), 0)  # Room for the last end
+            return ufunc.reduceat(values, indices)[0::2]
+
+        mins, maxs = mins[low:high], maxs[low:high]
+        if squares is None:
+            squares = np.square(y[low:high], dtype=np.float32)
+        else:
+            # A unit crossing an end of the range also summarises samples
+            # outside it (the track beyond a slice, or a partial last block):
+            # those are recomputed from the range's own samples
+            mins, maxs, squares = (np.array(a, dtype=np.float32) for a in (mins, maxs, squares[low:high]))
+            for k in {low, high - 1}:
+                begin, end = k * unit - offset, (k + 1) * unit - offset
+                if begin < 0 or end > self.length:
+                    part = y[max(begin, 0):min(end, self.length)]
+                    mins[k - low], maxs[k - low] = part.min(), part.max()
+                    squares[k - low] = np.mean(np.square(part, dtype=np.float32))
+        result[0, inside] = reduce(np.minimum, mins)
+        result[1, inside] = reduce(np.maximum, maxs)
+        result[2, inside] = np.sqrt(np.maximum(reduce(np.add, squares) / (ends - starts), 0))
+        return result
+
+
+def load_peaks(path, y, sr, offset=0.0, cache_dir=None):
+    # The pyramid of `y`, the samples of the audio file at `path` from
+    # `offset` seconds on. When the whole track's samples are in cache_dir,
+    # one pyramid of the whole track is kept next to them and sliced to the
+    # range. Otherwise the range's own pyramid is built in memory, so a
+    # preview never decodes more of the file than it shows.
+    if not is_cached(path, cache_dir):
+        return PeakPyramid.build(y)
+
+    track, track_sr = load_audio_range(path, cache_dir=cache_dir)
+    start = int(round(offset * sr))  # Same rounding as load_audio_range
+    if track_sr != sr or start + len(y) > len(track):
+        return PeakPyramid.build(y)
+
+    peaks_path = os.path.join(cache_dir, "peaks", f"{file_digest(path)}.peaks.npz")
+    peaks = PeakPyramid.load(peaks_path) if os.path.exists(peaks_path) else None
+    if peaks is None or peaks.length != len(track):
+        peaks = PeakPyramid.build(track)
+        os.makedirs(os.path.dirname(peaks_path), exist_ok=True)
+        peaks.save(peaks_path)
+    return peaks.slice(start, len(y))
+
+
+class PeakWindows:
+    # FrameWindows for wide windows: every frame is the min/max envelope of
+    # `window_seconds` around it as one pair of points per column, (max, min)
+    # and (min, max) in turn so the line crosses each column only once. Works
+    # in place of the raw samples with every drawing function.
+    def __init__(self, y, sr, fps, duration, window_seconds, columns, peaks):
+        self.y = y
+        self.sr = sr
+        self.fps = fps
+        self.window_size = window_seconds * sr
+        self.columns = max(1, int(columns))
+        self.peaks = peaks
+        self.frame_count = max(1, int(np.ceil(duration * fps)))
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, frame_index):
+        center = frame_index * self.sr / self.fps
+        start = center - self.window_size / 2
+        mins, maxs, _ = self.peaks.columns(self.y, start, start + self.window_size, self.columns)
+        envelope = np.empty((self.columns, 2), dtype=np.float32)
+        envelope[0::2] = np.stack([maxs[0::2], mins[0::2]], axis=1)
+        envelope[1::2] = np.stack([mins[1::2], maxs[1::2]], axis=1)
+        return envelope.reshape(-1)
+
+    def frame_at(self, t):
+        return min(max(0, int(round(t * self.fps))), len(self) - 1)
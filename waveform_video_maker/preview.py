@@ -0,0 +1,99 @@
+# Single-frame previews at a fraction of the output resolution, fast enough
+# to follow the interface's sliders. Only the audio the frame shows is
+# decoded; it and the scaled background are kept between calls.
+import dataclasses
+
+import numpy as np
+
+from .audio import WINDOW_SECONDS, audio_duration, load_audio_range
+from .compositor import Background, load_background_image
+from .engine import FrameRenderer
+from .peaks import load_peaks
+from .video_source import read_frame
+
+PREVIEW_SCALE = 0.25
+
+
+class PreviewRenderer:
+    def __init__(self, scale=PREVIEW_SCALE, cache_dir=None):
+        self.scale = scale
+        self.cache_dir = cache_dir
+        self._duration_key = None
+        self._duration = None
+        self._audio_key = None
+        self._audio = None
+        self._peaks = None
+        self._background_key = None
+        self._background = None
+
+    def track_duration(self, path):
+        if path != self._duration_key:
+            self._duration = audio_duration(path, self.cache_dir)
+            self._duration_key = path
+        return self._duration
+
+    def load_audio(self, path, offset, duration):
+        # Samples of [offset, offset + duration) of the file. A cached track
+        # is sliced; otherwise only this range is decoded, and the cache is
+        # left to full renders.
+        key = (path, offset, duration)
+        if key != self._audio_key:
+            y, sr = load_audio_range(path, offset, duration, cache_dir=self.cache_dir)
+            self._audio = y, sr, len(y) / sr
+            self._peaks = None
+            self._audio_key = key
+        return self._audio
+
+    def load_peaks(self):
+        # Peak pyramid of the loaded audio, loaded (or built) on the first
+        # wide-window preview of it
+        if self._peaks is None:
+            y, sr, _ = self._audio
+            path, offset, _ = self._audio_key
+            self._peaks = load_peaks(path, y, sr, offset, cache_dir=self.cache_dir)
+        return self._peaks
+
+    def size(self, settings):
+        return tuple(int(round(v * self.scale)) for v in settings.video_size)
+
+    def _load_background(self, settings):
+        # Background videos are previewed with their first frame
+        size = self.size(settings)
+        key = (settings.background_image, settings.background_video, size)
+        if key != self._background_key:
+            if settings.background_image:
+                self._background = load_background_image(settings.background_image, size)
+            elif settings.background_video:
+                self._background = Background(read_frame(settings.background_video, 0, size))
+            else:
+                self._background = None
+            self._background_key = key
+        return self._background
+
+    def render(self, settings, position=0.5):
+        # RGB frame at `position` (0 to 1) through the audio
+        fps = settings.fps
+        track_duration = self.track_duration(settings.audio_file)
+        frame_index = int(round(min(max(position, 0.0), 1.0) * max(track_duration - 1.0 / fps, 0.0) * fps))
+
+        # The samples the frame shows, from a frame boundary so the frame's
+        # window lands where it would in a render
+        half_window = (settings.waveform_window or WINDOW_SECONDS) / 2
+        first = max(0, int(np.floor(frame_index - half_window * fps)))
+        offset = first / fps
+        t = (frame_index - first) / fps
+        y, sr, duration = self.load_audio(settings.audio_file, offset, t + half_window + 1.0 / fps)
+        background = self._load_background(settings)
+        peaks = self.load_peaks() if settings.waveform_window else None
+
+        # The renderer loads no background of its own, the cached one is used
+        # instead; preview frames don't go to the layer cache
+        renderer = FrameRenderer(dataclasses.replace(settings, background_image=None, background_video=None,
+                                                     layer_cache=False),
+                                 y, sr, duration, scale=self.scale, peaks=peaks)
+        if background is not None:
+            renderer.background = background
+        try:
+            return renderer.make_frame(t).copy()
+        finally:
+            renderer.close()
@@ -0,0 +1,129 @@
+# Per-stage render instrumentation. Each stage records its wall time, how
+# far it raised the process's peak resident memory and the resident memory
+# as it ends. The report also holds the peak resident memory of every
+# process involved. Switched off, stages cost a shared no-op context manager.
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def peak_rss(process):
+    # High-water mark of the process's resident memory, in bytes
+    if sys.platform == "win32":
+        return process.memory_info().peak_wset
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class NullProfile:
+    enabled = False
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def take(self):
+        return None
+
+    def merge(self, samples):
+        pass
+
+
+NULL_PROFILE = NullProfile()
+
+
+class RenderProfile:
+    enabled = True
+
+    def __init__(self):
+        import psutil
+
+        self.durations = defaultdict(list)
+        self.peak_growth = defaultdict(int)
+        self.rss_after = defaultdict(int)
+        self.peak_rss = 0
+        self._process = psutil.Process(os.getpid())
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # The high-water mark only moves when a stage needs more memory than
+        # any before it, so the stages that grew it are the ones that set the
+        # process's peak. Tracing every allocation instead would slow down
+        # the stages being timed.
+        peak_before = peak_rss(self._process)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name].append(time.perf_counter() - started)
+            self.peak_growth[name] += peak_rss(self._process) - peak_before
+            self.rss_after[name] = max(self.rss_after[name], self._process.memory_info().rss)
+
+    def process_peak_rss(self):
+        # Highest resident memory of this process and of the ones merged in
+        return max(self.peak_rss, peak_rss(self._process))
+
+    def take(self):
+        # Hands the samples recorded so far to another process's merge()
+        samples = dict(self.durations), dict(self.peak_growth), dict(self.rss_after), self.process_peak_rss()
+        self.durations = defaultdict(list)
+        self.peak_growth = defaultdict(int)
+        self.rss_after = defaultdict(int)
+        return samples
+
+    def merge(self, samples):
+        if not samples:
+            return
+        durations, peak_growth, rss_after, process_peak = samples
+        for name, values in durations.items():
+            self.durations[name].extend(values)
+        for name, value in peak_growth.items():
+            self.peak_growth[name] += value
+        for name, value in rss_after.items():
+            self.rss_after[name] = max(self.rss_after[name], value)
+        self.peak_rss = max(self.peak_rss, process_peak)
+
+    def summary(self):
+        stages = {}
+        for name, values in self.durations.items():
+            values = np.array(values)
+            total = float(values.sum())
+            stages[name] = {
+                "count": len(values),
+                "total_seconds": total,
+                "mean_ms": 1000 * total / len(values),
+                **{f"p{p}_ms": 1000 * float(np.percentile(values, p)) for p in PERCENTILES},
+                "max_ms": 1000 * float(values.max()),
+                "per_second": len(values) / total if total else None,
+                "peak_growth_mb": self.peak_growth[name] / (1024 * 1024),
+                "rss_after_mb": self.rss_after[name] / (1024 * 1024),
+            }
+        return stages
+
+
+def report_path(output_file):
+    return os.path.splitext(output_file)[0] + ".perf.json"
+
+
+def write_report(path, profile, settings, frames, wall_seconds):
+    report = {
+        "output_file": settings.output_file,
+        "settings": asdict(settings),
+        "frames": frames,
+        "wall_seconds": wall_seconds,
+        "fps": frames / wall_seconds if wall_seconds else None,
+        "peak_rss_mb": profile.process_peak_rss() / (1024 * 1024),
+        "stages": profile.summary(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
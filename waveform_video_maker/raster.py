@@ -0,0 +1,200 @@
+# NumPy drawing backend: rasterizes the waveform polylines, including the
+# layered glow strokes, straight into a preallocated RGBA buffer instead of
+# going through a matplotlib figure every frame.
+import numpy as np
+from PIL import ImageColor
+
+# Glow passes drawn under the main line, widest first: (width factor, alpha).
+# Mirrors the ax.plot calls in draw_linear_waveform/draw_circle_waveform.
+GLOW_STROKES = [(i * 0.5, 0.1 * i) for i in range(5, 0, -1)] + [(1.0, 1.0)]
+
+# Segments are split into pieces at most this many pixels across their
+# shorter side, so each piece fits in a narrow band along its longer side
+MAX_PIECE_LENGTH = 2.0
+
+# Upper bound on pixels evaluated at once, keeps temporaries cache sized
+CHUNK_PIXELS = 1 << 18
+
+# Entries of the opacity lookup table over squared distance
+ALPHA_STEPS = 4096
+
+
+def parse_color(color):
+    return np.array(ImageColor.getrgb(color)[:3], dtype=np.float32)
+
+
+def stroke_alpha(distance, half_widths, alphas):
+    # Combined opacity of concentric anti-aliased strokes of one color at the
+    # given distance (in pixels) from the centre line
+    transparency = np.ones_like(distance)
+    for half_width, alpha in zip(half_widths, alphas):
+        coverage = np.clip(np.minimum(half_width + 0.5 - distance, 2 * half_width), 0, 1)
+        transparency *= 1 - alpha * coverage
+    return 1 - transparency
+
+
+class WaveformRasterizer:
+    def __init__(self, width, height, bg_color="#000000", dpi=100):
+        self.width = width
+        self.height = height
+        self.px_per_point = dpi / 72.0  # matplotlib line widths are in points
+
+        # Black keeps the layer transparent, like the matplotlib backend. Its
+        # transparent pixels are white, which the glow blurs into the halo.
+        if bg_color.lower() == "#000000":
+            self.fill = np.array([255, 255, 255, 0], dtype=np.uint8)
+        else:
+            self.fill = np.array(ImageColor.getrgb(bg_color)[:3] + (255,), dtype=np.uint8)
+
+        self.buffer = np.empty((height, width, 4), dtype=np.uint8)
+        self.distance = np.empty(height * width, dtype=np.float32)
+
+    def clear(self):
+        # Fill whole pixels at once rather than broadcasting per channel
+        self.buffer.view(np.uint32).fill(self.fill.view(np.uint32)[0])
+
+    def linear_points(self, y_frame, horizontal_offset=0, vertical_scale=1.0, overdrawn_width=None):
+        # Same mapping as the matplotlib axes: x spans [0, overdrawn_width],
+        # y spans [-vertical_scale, vertical_scale]
+        overdrawn_width = overdrawn_width or self.width
+        x_values = np.linspace(0, overdrawn_width, len(y_frame)) + horizontal_offset
+        x = x_values * (self.width / overdrawn_width)
+        y = (1 - np.asarray(y_frame, dtype=np.float64) / vertical_scale) * (self.height / 2)
+        return x, y
+
+    def polar_points(self, theta, radius, r_max):
+        # Polar axes keep a square aspect, centred in the frame
+        scale = min(self.width, self.height) / 2 / r_max
+        x = self.width / 2 + radius * scale * np.cos(theta)
+        y = self.height / 2 - radius * scale * np.sin(theta)
+        return x, y
+
+    def draw_polyline(self, x, y, color, thickness, strokes=GLOW_STROKES):
+        if len(x) < 2:
+            return
+        half_widths = [thickness * factor * self.px_per_point / 2 for factor, _ in strokes]
+        alphas = [alpha for _, alpha in strokes]
+        reach = max(half_widths) + 1
+
+        # Opacity is looked up by squared distance rather than computed per pixel
+        index, distance_sq = self._distance_field(x, y, reach)
+        steps = (ALPHA_STEPS - 1) / (reach * reach)
+        table = stroke_alpha(np.sqrt(np.arange(ALPHA_STEPS, dtype=np.float32) / steps), half_widths, alphas)
+        distance_sq *= steps
+        distance_sq += 0.5
+        alpha = table[distance_sq.astype(np.int32)]
+        self._blend(index, alpha, parse_color(color))
+
+    def _distance_field(self, x, y, reach):
+        # Returns the flat indices of every pixel within reach of the polyline
+        # and their squared distance to it
+        width, height = self.width, self.height
+        x = np.asarray(x, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        ax, ay = x[:-1], y[:-1]
+        dx, dy = x[1:] - ax, y[1:] - ay
+
+        # Split segments on their shorter side, so every piece fits in a band
+        # a fixed number of pixels wide running along its longer side
+        pieces = np.maximum(1, np.ceil(np.minimum(np.abs(dx), np.abs(dy)) / MAX_PIECE_LENGTH)).astype(np.int64)
+        segment = np.repeat(np.arange(len(ax)), pieces)
+        part = (np.arange(len(segment)) - np.repeat(np.cumsum(pieces) - pieces, pieces)).astype(np.float32)
+        count = pieces[segment].astype(np.float32)
+        sx = dx[segment] / count
+        sy = dy[segment] / count
+        px = ax[segment] + sx * part
+        py = ay[segment] + sy * part
+
+        length_sq = sx * sx + sy * sy
+        inv_length_sq = 1 / np.where(length_sq > 0, length_sq, 1)
+        reach_sq = np.float32(reach * reach)
+
+        dist = self.distance
+        dist.fill(np.inf)
+
+        # Steep pieces are walked row by row, shallow ones column by column.
+        # "a" is the axis walked along, "b" the one across the band.
+        steep = np.abs(sy) >= np.abs(sx)
+        for rows, chosen in ((True, np.flatnonzero(steep)), (False, np.flatnonzero(~steep))):
+            if not len(chosen):
+                continue
+            if rows:
+                pa, pb, da, db, size_a, size_b, stride_a, stride_b = py, px, sy, sx, height, width, width, 1
+            else:
+                pa, pb, da, db, size_a, size_b, stride_a, stride_b = px, py, sx, sy, width, height, 1, width
+            pa, pb, da, db, inv = pa[chosen], pb[chosen], da[chosen], db[chosen], inv_length_sq[chosen]
+
+            # The band covers the piece's extent across plus the reach on
+            # both sides; it is kept inside the frame, which it always fits
+            band = min(int(np.ceil(np.abs(db).max() + 2 * reach)) + 2, size_b)
+            b0 = np.clip(np.floor(np.minimum(pb, pb + db) - reach), 0, size_b - band)
+            a0 = np.maximum(np.floor(np.minimum(pa, pa + da) - reach), 0)
+            a1 = np.minimum(np.ceil(np.maximum(pa, pa + da) + reach), size_a)
+            lines = np.maximum(a1 - a0, 0).astype(np.int64)
+            offsets = np.arange(band, dtype=np.float32)
+            flat_offsets = np.arange(band, dtype=np.int32) * stride_b
+
+            # Chunks of whole pieces, each evaluated as (lines, band) pixels
+            ends = np.cumsum(lines)
+            step = max(1, CHUNK_PIXELS // band)
+            first = 0
+            while first < len(chosen):
+                last = max(int(np.searchsorted(ends, ends[first] - lines[first] + step, side="right")), first + 1)
+                n = lines[first:last]
+                owner = np.repeat(np.arange(first, last), n)
+                first = last
+                if not len(owner):
+                    continue
+                line = a0[owner] + (np.arange(len(owner)) - np.repeat(np.cumsum(n) - n, n)).astype(np.float32)
+
+                # Squared distance from pixel centres to the piece. Everything
+                # but the offset across the band is worked out once per line;
+                # arrays are (band, lines) so the inner loops run along lines.
+                qa = line - pa[owner] + 0.5
+                qb = b0[owner] - pb[owner] + 0.5
+                line_da, line_db, line_inv = da[owner], db[owner], inv[owner]
+                t = offsets[:, None] * (line_db * line_inv) + (qa * line_da + qb * line_db) * line_inv
+                np.clip(t, 0, 1, out=t)
+                ea = qa - t * line_da
+                t *= line_db
+                eb = offsets[:, None] + qb
+                eb -= t
+                ea *= ea
+                eb *= eb
+                ea += eb
+
+                near = ea < reach_sq
+                starts = line.astype(np.int32) * stride_a + b0[owner].astype(np.int32) * stride_b
+                flat = flat_offsets[:, None] + starts
+                np.minimum.at(dist, flat[near], ea[near])
+
+        index = np.flatnonzero(dist < reach_sq)
+        return index, dist[index]
+
+    def _blend(self, index, alpha, color):
+        # Straight-alpha "over" onto whatever is already in the buffer. Pixels
+        # are gathered and scattered as packed uint32, much cheaper than
+        # fancy-indexing rows of four bytes
+        pixels = self.buffer.view(np.uint32).reshape(-1)
+        existing = pixels[index]
+        alpha_bytes = (alpha * 255 + 0.5).astype(np.uint32)
+
+        # Over a fully transparent pixel the result is just the stroke colour;
+        # that is most of the stroke, so it skips the float blend below.
+        # Pixels the stroke doesn't reach keep their colour.
+        clear = existing < (1 << 24)
+        packed = np.append(np.round(color).astype(np.uint8), np.uint8(0)).view(np.uint32)[0]
+        pixels[index[clear & (alpha_bytes > 0)]] = packed | (alpha_bytes[clear & (alpha_bytes > 0)] << 24)
+
+        blend = ~clear
+        index, alpha, existing = index[blend], alpha[blend], existing[blend]
+        existing = existing.view(np.uint8).reshape(-1, 4).astype(np.float32)
+        below = existing[:, 3] * (1 - alpha) / 255.0
+        out_alpha = alpha + below
+
+        out = np.empty((len(index), 4), dtype=np.float32)
+        out[:, :3] = (color * alpha[:, None] + existing[:, :3] * below[:, None]) / out_alpha[:, None]
+        out[:, 3] = out_alpha * 255
+        out += 0.5
+        np.clip(out, 0, 255, out=out)
+        pixels[index] = out.astype(np.uint8).view(np.uint32).reshape(-1)
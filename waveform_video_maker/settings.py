@@ -0,0 +1,126 @@
+import dataclasses
+import os
+from dataclasses import dataclass, fields
+
+# Cache location used by the interface
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "WaveformVideoMaker")
+
+
+@dataclass
+class RenderSettings:
+    # Inputs
+    audio_file: str = ""
+    output_file: str = ""
+    title_card_start: str = None
+    title_card_end: str = None
+
+    # Colors
+    bg_color: str = "#000000"  # Black means a transparent waveform layer
+    wf_color: str = "#FFFFFF"
+    second_waveform_color: str = "#FF0000"
+
+    # Waveform settings
+    circle_waveform: bool = False
+    draw_second_circle: bool = False
+    line_thickness: float = 1
+    first_waveform_scale: float = 1.0
+    second_waveform_scale: float = 1.0
+    waveform_window: float = None  # Seconds of audio across the frame (peak envelope); None draws 50 ms of samples
+
+    # Drawing backend: "matplotlib" or "numpy" (much faster, near-identical look)
+    renderer: str = "matplotlib"
+
+    # Bloom settings
+    blur_radius: int = 30
+    bloom_intensity: float = 2
+    fast_bloom: bool = True  # Blur only around the waveform, downsampled for large radii
+
+    # Backgrounds
+    background_image: str = None
+    background_video: str = None
+
+    # Output
+    aspect_ratio_9_16: bool = False
+    resolution: int = 1080  # Short side in pixels, even; line widths and blur scale with it
+    fps: int = 24
+    start_time: float = 0  # Seconds into the audio where the video starts
+    limit_duration: float = None  # Render only N seconds (previews)
+
+    # Performance
+    workers: int = 1  # Processes drawing frames; 1 renders in the calling process
+    chunk_frames: int = 12  # Consecutive frames handed to a worker at a time
+    cache_dir: str = None  # Where decoded audio is kept between renders; None disables caching
+    skip_duplicate_frames: bool = True  # Reuse the last layer when a frame's samples are unchanged
+    silence_threshold: float = 0.001  # Peak amplitude below which a frame is drawn as silence; 0 disables
+    layer_cache: bool = False  # Keep finished waveform layers in cache_dir; restyled backgrounds reuse them
+    profile: bool = False  # Time every render stage and write <output>.perf.json
+
+    # Encoding
+    encoder: str = "ffmpeg"  # "ffmpeg" pipes frames straight to ffmpeg; "moviepy" uses write_videofile
+    codec: str = "libx264"
+    preset: str = "ultrafast"
+    crf: int = None  # Constant rate factor; None keeps the codec's default
+    encode_threads: int = 4
+
+    # Extra outputs rendered in the same pass, e.g.
+    # [{"output_file": "short.mp4", "aspect_ratio_9_16": true}, {"output_file": "proxy.mp4", "resolution": 720}]
+    # Each entry overrides these settings; the audio and its range are shared.
+    renditions: list = None
+
+    @property
+    def video_size(self):
+        long_side = int(round(self.resolution * 16 / 9 / 2)) * 2
+        if self.aspect_ratio_9_16:
+            return self.resolution, long_side
+        return long_side, self.resolution
+
+    @property
+    def render_scale(self):
+        # Size relative to the 1080p look line widths and blur radius are set for
+        return self.resolution / 1080
+
+    def validate(self):
+        # Settings that can't render, caught before anything is decoded
+        # H.264 and most other codecs only take even frame sizes
+        if not isinstance(self.resolution, int) or self.resolution <= 0 or self.resolution % 2:
+            raise ValueError(f"resolution must be a positive even number of pixels, not {self.resolution!r}")
+        if self.layer_cache and not self.cache_dir:
+            raise ValueError("layer_cache needs a cache_dir to keep the layers in")
+
+    def expand_renditions(self):
+        # Settings of every output of this render: these settings alone, or
+        # one per rendition, each validated
+        if not self.renditions:
+            self.validate()
+            return [self]
+
+        known = {f.name for f in fields(self)}
+        # The audio, plus what render_video reads once for the whole render
+        shared = {"audio_file", "start_time", "limit_duration", "renditions", "encoder", "workers", "profile",
+                  "cache_dir"}
+        outputs = []
+        for rendition in self.renditions:
+            unknown = set(rendition) - known
+            if unknown:
+                raise ValueError(f"Unknown render settings: {', '.join(sorted(unknown))}")
+            if shared & set(rendition):
+                raise ValueError(f"Renditions can't change {', '.join(sorted(shared & set(rendition)))}")
+            if not rendition.get("output_file"):
+                raise ValueError("Every rendition needs an output_file")
+            outputs.append(dataclasses.replace(self, renditions=None, **rendition))
+            outputs[-1].validate()
+
+        names = [os.path.abspath(output.output_file) for output in outputs]
+        if len(set(names)) < len(names):
+            raise ValueError("Renditions must have different output files")
+        return outputs
+
+    @classmethod
+    def from_dict(cls, values):
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown render settings: {', '.join(sorted(unknown))}")
+        # Empty strings from the UI mean "not set"
+        return cls(**{k: (None if v == "" and k not in ("audio_file", "output_file") else v)
+                      for k, v in values.items()})
@@ -0,0 +1,144 @@
+# Background video source: ffmpeg decodes and scales the clip once, on a
+# separate thread, into a cache holding one loop of the clip at the output
+# frame rate. Later loops are served straight from the cache. A clip longer
+# than the render is only decoded as far as the render goes.
+import os
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+# Loops larger than this are cached in a memory-mapped file instead of RAM
+MEMORY_CACHE_LIMIT = 1 << 30
+
+
+def ffmpeg_binary():
+    # Same binary MoviePy uses (FFMPEG_BINARY environment variable or imageio-ffmpeg)
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
+
+
+def read_frame(path, t, size):
+    # A single frame of a video, scaled to `size` (previews)
+    width, height = size
+    result = subprocess.run(
+        [ffmpeg_binary(), "-v", "error", "-ss", str(t), "-i", path, "-frames:v", "1",
+         "-vf", f"scale={width}:{height}", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if len(result.stdout) < width * height * 3:
+        raise ValueError(f"Could not read a frame of {path}")
+    return np.frombuffer(result.stdout, dtype=np.uint8)[:width * height * 3].reshape(height, width, 3)
+
+
+class BackgroundVideoSource:
+    def __init__(self, path, size, fps, memory_limit=MEMORY_CACHE_LIMIT, cache_dir=None, max_duration=None):
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+        width, height = size
+        self.fps = fps
+        self.duration = ffmpeg_parse_infos(path)['duration']
+        if not self.duration:
+            raise ValueError(f"Could not read the duration of {path}")
+
+        # Frames past max_duration (the render's length) are never shown
+        decode_duration = self.duration if max_duration is None else min(self.duration, max_duration)
+        capacity = int(np.ceil(decode_duration * fps)) + 1
+        shape = (capacity, height, width, 3)
+        self.cache_file = None
+        if int(np.prod(shape)) <= memory_limit:
+            self.frames = np.empty(shape, dtype=np.uint8)
+        else:
+            fd, self.cache_file = tempfile.mkstemp(prefix="wvm-background-", suffix=".rgb", dir=cache_dir)
+            os.close(fd)
+            self.frames = np.memmap(self.cache_file, dtype=np.uint8, mode='w+', shape=shape)
+
+        self.decoded = 0
+        self.finished = False
+        self.error = None
+        self._condition = threading.Condition()
+        self._process = subprocess.Popen(
+            [ffmpeg_binary(), "-v", "error", "-i", path, "-t", str(decode_duration),
+             "-vf", f"fps={fps},scale={width}:{height}",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def attach(cls, shared):
+        # Opens a loop fully decoded by another process (see share()) read-only
+        source = cls.__new__(cls)
+        cache_file, shape, source.fps, source.duration, source.decoded = shared
+        source.frames = np.memmap(cache_file, dtype=np.uint8, mode='r', shape=shape)
+        source.cache_file = None  # Owned by the process that decoded it
+        source.finished = True
+        source.error = None
+        source._condition = threading.Condition()
+        source._process = None
+        source._thread = None
+        return source
+
+    def share(self):
+        # Description of the decoded loop that other processes can attach() to
+        self.wait()
+        if self.cache_file is None:
+            raise ValueError("Only file-backed caches can be shared between processes")
+        self.frames.flush()
+        return self.cache_file, self.frames.shape, self.fps, self.duration, self.decoded
+
+    def _decode(self):
+        try:
+            stream = self._process.stdout
+            while self.decoded < len(self.frames):
+                view = memoryview(self.frames[self.decoded]).cast('B')
+                filled = 0
+                while filled < len(view):
+                    count = stream.readinto(view[filled:])
+                    if not count:
+                        break
+                    filled += count
+                if filled < len(view):
+                    break
+                with self._condition:
+                    self.decoded += 1
+                    self._condition.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._process.stdout.close()
+            self._process.wait()
+            with self._condition:
+                self.finished = True
+                self._condition.notify_all()
+
+    def wait(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self.finished)
+        if self.error:
+            raise self.error
+        if not self.decoded:
+            raise ValueError("Background video has no frames")
+
+    def get_frame(self, t):
+        # Frame shown at time t of the output, looping the clip
+        if t >= self.duration:
+            # Looping needs the real loop length, i.e. a finished decode
+            self.wait()
+            t = t % self.duration
+        index = int(t * self.fps + 1e-5)  # Frame times like 7 * (1 / 24) land just below the frame
+        with self._condition:
+            self._condition.wait_for(lambda: self.decoded > index or self.finished)
+        if not self.decoded:
+            self.wait()
+        return self.frames[min(index, self.decoded - 1)]
+
+    def close(self):
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+        if self._thread:
+            self._thread.join()
+        self.frames = None
+        if self.cache_file:
+            os.remove(self.cache_file)
+            self.cache_file = None
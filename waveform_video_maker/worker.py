@@ -0,0 +1,273 @@
+# Warm render worker: a long-lived process that keeps the interpreter, the
+# imported libraries and matplotlib's figures loaded, and renders jobs sent
+# over a local socket (a named pipe on Windows). Scripts rendering many short
+# clips then pay for start-up once instead of once per clip.
+#
+#   python -m waveform_video_maker.worker serve
+#   python -m waveform_video_maker.worker render manifest.json
+#   python -m waveform_video_maker.worker stop
+#
+# Or from Python:
+#   with WorkerClient() as worker:
+#       worker.render(RenderSettings(audio_file="ep01.mp3", output_file="ep01.mp4"))
+#
+# Connections are authenticated with a key kept next to the default socket,
+# readable only by the user who started the worker.
+import argparse
+import dataclasses
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import wave
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from .settings import DEFAULT_CACHE_DIR, RenderSettings
+
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\WaveformVideoMaker"
+else:
+    DEFAULT_ADDRESS = os.path.join(DEFAULT_CACHE_DIR, "worker.sock")
+DEFAULT_KEY_FILE = os.path.join(DEFAULT_CACHE_DIR, "worker.key")
+
+
+def parse_address(address):
+    # "host:port" listens on TCP, anything else is a socket path or pipe name
+    match = re.fullmatch(r"([\w.-]+):(\d+)", address or "")
+    if match:
+        return match.group(1), int(match.group(2))
+    return address or DEFAULT_ADDRESS
+
+
+def load_key(path=DEFAULT_KEY_FILE, create=False):
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # Another worker just created it
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip().encode()
+
+
+def warm_up():
+    # Loads everything a render needs, decodes a short generated WAV and draws
+    # a few throwaway frames at the default output size, so the first real
+    # job doesn't pay for imports, the first decode, font caches or figures
+    from .audio import load_audio_range
+    from .engine import FrameRenderer
+    from .video_source import ffmpeg_binary
+
+    ffmpeg_binary()
+    sr = 22050
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, sr).astype(np.float32)
+    fd, path = tempfile.mkstemp(prefix="wvm-warm-up-", suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sr)
+            wav.writeframes((samples * 32767).astype("<i2").tobytes())
+        y, sr = load_audio_range(path)
+    finally:
+        os.remove(path)
+
+    for renderer in ("matplotlib", "numpy"):
+        for circle_waveform in (False, True):
+            # Figures are reused by size, so this one serves the first real job
+            settings = RenderSettings(renderer=renderer, circle_waveform=circle_waveform)
+            frame_renderer = FrameRenderer(settings, y, sr, 1.0)
+            try:
+                frame_renderer.make_frame(0.5)
+            finally:
+                frame_renderer.close()
+
+
+def _listening(address, authkey):
+    # Whether a live worker (or anything else) answers on `address`
+    try:
+        Client(address, authkey=authkey).close()
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    except (AuthenticationError, EOFError):
+        pass  # Listening, but with another key
+    return True
+
+
+def _handle(request, connection, render_lock, stopping):
+    from .engine import render_video
+
+    command = request[0]
+    if command == "ping":
+        connection.send(("ok", os.getpid()))
+    elif command == "render":
+        # Jobs run one after another, each with the whole process to itself.
+        # The reply goes out under the lock too, so a stopping worker waits
+        # until it is sent.
+        with render_lock:
+            if stopping.is_set():
+                connection.send(("error", "The worker is stopping"))
+                return
+            started = time.perf_counter()
+            try:
+                result = render_video(RenderSettings.from_dict(request[1]), logger=None)
+                reply = "ok", result, time.perf_counter() - started
+            except Exception:
+                reply = "error", traceback.format_exc(), time.perf_counter() - started
+            print(f"{request[1].get('output_file')}: {'done' if reply[0] == 'ok' else 'FAILED'} ({reply[2]:.1f}s)")
+            connection.send(reply)
+    else:
+        connection.send(("error", f"Unknown command: {command}"))
+
+
+def _serve_client(connection, listener, render_lock, stopping):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                return
+            if request[0] == "stop":
+                connection.send(("ok",))
+                stopping.set()
+                # An unauthenticated connection wakes up accept() in the main thread
+                Client(listener.address).close()
+                return
+            _handle(request, connection, render_lock, stopping)
+
+
+def serve(address=None, key_file=DEFAULT_KEY_FILE, warm=True):
+    address = parse_address(address)
+    authkey = load_key(key_file, create=True)
+    if isinstance(address, str) and not address.startswith("\\\\"):
+        os.makedirs(os.path.dirname(os.path.abspath(address)), exist_ok=True)
+        if os.path.exists(address):
+            if _listening(address, authkey):
+                raise RuntimeError(f"A worker is already running on {address}")
+            # A socket left behind by a worker that didn't shut down cleanly
+            os.remove(address)
+
+    if warm:
+        started = time.perf_counter()
+        warm_up()
+        print(f"Warmed up in {time.perf_counter() - started:.1f}s")
+
+    # Every client gets a thread, so an idle or waiting client never blocks
+    # the others; the renders themselves take turns
+    render_lock = threading.Lock()
+    stopping = threading.Event()
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Waiting for jobs on {listener.address}")
+        while not stopping.is_set():
+            try:
+                connection = listener.accept()
+            except (AuthenticationError, OSError, EOFError) as e:
+                if stopping.is_set():
+                    break
+                # A client with the wrong key, or one that went away while connecting
+                print(f"Rejected connection: {e}")
+                continue
+            threading.Thread(target=_serve_client, args=(connection, listener, render_lock, stopping),
+                             daemon=True).start()
+
+    # Client threads die with the process; let a render in progress finish first
+    with render_lock:
+        pass
+
+
+class WorkerClient:
+    def __init__(self, address=None, key_file=DEFAULT_KEY_FILE):
+        self.connection = Client(parse_address(address), authkey=load_key(key_file))
+
+    def _call(self, *request):
+        self.connection.send(request)
+        return self.connection.recv()
+
+    def ping(self):
+        # Process id of the worker
+        return self._call("ping")[1]
+
+    def render(self, settings):
+        # Renders a RenderSettings (or a dict of its fields) in the worker and
+        # returns what render_video returned there
+        if isinstance(settings, RenderSettings):
+            settings = dataclasses.asdict(settings)
+        reply = self._call("render", settings)
+        if reply[0] != "ok":
+            raise RuntimeError(f"Render failed in the worker:\n{reply[1]}")
+        return reply[1]
+
+    def stop(self):
+        self._call("stop")
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a warm render process and send it jobs.")
+    parser.add_argument("--address", help=f"Socket path, pipe name or host:port (default: {DEFAULT_ADDRESS})")
+    parser.add_argument("--key-file", default=DEFAULT_KEY_FILE,
+                        help=f"Shared key authenticating clients (default: {DEFAULT_KEY_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Start a worker and wait for jobs")
+    serve_parser.add_argument("--no-warm-up", action="store_true", help="Skip the throwaway frames drawn at start")
+    render_parser = commands.add_parser("render", help="Render the jobs of a batch manifest in a running worker")
+    render_parser.add_argument("manifest", help="JSON manifest of render jobs (same format as the batch CLI)")
+    commands.add_parser("stop", help="Stop a running worker")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            serve(args.address, args.key_file, warm=not args.no_warm_up)
+        except KeyboardInterrupt:
+            pass
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "stop":
+        WorkerClient(args.address, args.key_file).stop()
+        return 0
+
+    from .batch import load_manifest, output_files
+
+    jobs = load_manifest(args.manifest)
+    failed = 0
+    with WorkerClient(args.address, args.key_file) as worker:
+        for done, job in enumerate(jobs, start=1):
+            name = ", ".join(output_files(job))
+            started = time.perf_counter()
+            try:
+                worker.render(job)
+            except RuntimeError as e:
+                failed += 1
+                print(f"[{done}/{len(jobs)}] FAILED {name}\n{e}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(jobs)}] {name} ({time.perf_counter() - started:.1f}s)")
+
+    if failed:
+        print(f"{failed} of {len(jobs)} job(s) failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())